@@ -0,0 +1 @@
+PYTHONPATH=src python3 -m bench.gate "$@"
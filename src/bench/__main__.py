@@ -0,0 +1,53 @@
+import sys
+import json
+import argparse
+from bench.corpus import SHAPES
+from bench.runner import BENCHMARKS, SCALING_BENCHMARKS, SCALING_SIZES, run_benchmarks, run_scaling
+
+def main():
+    parser = argparse.ArgumentParser(prog="bench", description="Benchmark the Markdown engine and page generation")
+    parser.add_argument("--benchmark", action="append", choices=sorted(BENCHMARKS), help="benchmark to run (repeatable, default: all)")
+    parser.add_argument("--shape", action="append", choices=sorted(SHAPES), help="corpus shape to use (repeatable, default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--no-isolate", action="store_true", help="run every benchmark in this process")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--scaling", action="append", choices=sorted(SCALING_BENCHMARKS), help="instead, time this splitter on one paragraph of 10 to 100k links (repeatable)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SCALING_SIZES), help="links per paragraph for --scaling")
+    args = parser.parse_args()
+
+    if args.scaling:
+        report = run_scaling(args.scaling, args.sizes, args.repeat)
+        for result in report["scaling"]:
+            for point in result["points"]:
+                print(
+                    f"{result['name']:32} {point['links']:>8} links  p50 {point['p50_ms']:11.3f} ms"
+                    f"  {point['ns_per_link']:9.1f} ns/link",
+                    file=sys.stderr,
+                )
+            print(f"{result['name']:32} exponent {result['exponent']:.2f}", file=sys.stderr)
+        _write_report(report, args.output)
+        return
+
+    report = run_benchmarks(args.benchmark, args.shape, args.repeat, isolate=not args.no_isolate)
+    for result in report["results"]:
+        if "error" in result:
+            print(f"{result['name']:32} {result['shape']:16} {result['error']}", file=sys.stderr)
+        else:
+            print(
+                f"{result['name']:32} {result['shape']:16} {result['ops_per_sec']:12.1f} ops/s"
+                f"  p50 {result['p50_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms",
+                file=sys.stderr,
+            )
+
+    _write_report(report, args.output)
+
+def _write_report(report, output):
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
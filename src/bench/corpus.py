@@ -0,0 +1,95 @@
+import os
+import random
+
+WORDS = (
+    "elf hobbit ring shire wizard tower river forest mountain road song "
+    "king sword shadow light star ship council gate bridge lore age tale "
+    "journey friend fellowship quest dragon hall lamp ember stone harbor"
+).split()
+
+# pages, blocks per page and the block mix for each corpus shape
+SHAPES = {
+    "small-pages": (200, 12, {"paragraph": 4, "heading": 2, "list": 2, "code": 1, "quote": 1}),
+    "huge-pages": (3, 4000, {"paragraph": 5, "heading": 1, "list": 2, "code": 1, "quote": 1}),
+    "link-dense": (40, 40, {"links": 1}),
+    "emphasis-dense": (40, 40, {"emphasis": 1}),
+    "code-heavy": (40, 40, {"code": 3, "paragraph": 1}),
+    "list-heavy": (40, 40, {"list": 3, "ordered": 2, "paragraph": 1}),
+}
+
+
+class CorpusGenerator:
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+
+    def words(self, count):
+        return " ".join(self.rng.choice(WORDS) for _ in range(count))
+
+    def sentence(self):
+        return self.words(self.rng.randint(6, 16)).capitalize() + "."
+
+    def paragraph(self):
+        return " ".join(self.sentence() for _ in range(self.rng.randint(2, 5)))
+
+    def links(self, count=20):
+        parts = []
+        for i in range(count):
+            parts.append(f"{self.words(3)} [{self.words(2)}](/{self.rng.choice(WORDS)}/{i})")
+            if i % 7 == 0:
+                parts.append(f"![{self.words(2)}](/images/{self.rng.choice(WORDS)}.png)")
+        return " ".join(parts) + "."
+
+    def emphasis(self, count=20):
+        parts = []
+        for i in range(count):
+            marker = ("**{}**", "_{}_", "`{}`")[i % 3]
+            parts.append(f"{self.words(3)} {marker.format(self.words(2))}")
+        return " ".join(parts) + "."
+
+    def heading(self):
+        return "#" * self.rng.randint(2, 6) + " " + self.words(4).capitalize()
+
+    def unordered(self):
+        return "\n".join(f"- {self.words(self.rng.randint(3, 10))}" for _ in range(self.rng.randint(3, 12)))
+
+    def ordered(self):
+        return "\n".join(f"{i}. {self.words(self.rng.randint(3, 10))}" for i in range(1, self.rng.randint(4, 12)))
+
+    def code(self):
+        lines = [f"    {self.rng.choice(WORDS)}({self.rng.randint(0, 99)}) # {self.words(3)}" for _ in range(self.rng.randint(3, 20))]
+        return "```\n" + "\n".join(lines) + "\n```"
+
+    def quote(self):
+        return "\n".join(f"> {self.sentence()}" for _ in range(self.rng.randint(1, 4)))
+
+    def block(self, kind):
+        if kind == "list":
+            return self.unordered()
+        return getattr(self, kind)()
+
+    def page(self, blocks, mix):
+        kinds = list(mix)
+        weights = [mix[kind] for kind in kinds]
+        parts = [f"# {self.words(3).capitalize()}"]
+        for kind in self.rng.choices(kinds, weights, k=blocks):
+            parts.append(self.block(kind))
+        return "\n\n".join(parts) + "\n"
+
+
+def generate_markdown(shape, blocks=None, seed=0):
+    _, default_blocks, mix = SHAPES[shape]
+    return CorpusGenerator(seed).page(blocks or default_blocks, mix)
+
+
+def generate_corpus(dest_dir, shape, pages=None, blocks=None, seed=0):
+    default_pages, default_blocks, mix = SHAPES[shape]
+    generator = CorpusGenerator(seed)
+    paths = []
+    for i in range(pages or default_pages):
+        directory = os.path.join(dest_dir, f"section{i % 10}", f"page{i}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "index.md")
+        with open(path, "w") as f:
+            f.write(generator.page(blocks or default_blocks, mix))
+        paths.append(path)
+    return paths
@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import platform
+import subprocess
+from bench.runner import measure, measure_isolated
+
+HISTORY_VERSION = 1
+DEFAULT_HISTORY = os.path.join(".cache", "bench-history.json")
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_REPEAT = 15
+BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE = 0.95
+
+# (benchmark, corpus shape, threshold override). Page generation and the
+# full build write files and are noisier than the pure parsing benchmarks.
+GATE_BENCHMARKS = (
+    ("markdown_to_html_node.to_html", "huge-pages", None),
+    ("markdown_to_html_node.to_html", "link-dense", None),
+    ("text_to_textnodes", "emphasis-dense", None),
+    ("text_to_textnodes", "link-dense", None),
+    ("generate_pages_recursive", "small-pages", 0.15),
+    ("build_site", "small-pages", 0.15),
+)
+
+REGRESSED = "regressed"
+IMPROVED = "improved"
+UNCHANGED = "unchanged"
+
+
+def metric_key(name, shape):
+    return f"{name}[{shape}]"
+
+
+def machine_fingerprint():
+    # Timings are only comparable on the same hardware and interpreter.
+    parts = [
+        platform.machine(),
+        platform.processor(),
+        platform.python_implementation(),
+        platform.python_version(),
+        str(os.cpu_count()),
+        _cpu_model(),
+    ]
+    return hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _cpu_model():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return ""
+
+
+def current_commit():
+    # Returns (commit, dirty); ("unknown", False) outside a git checkout.
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, status != ""
+
+
+def median(samples):
+    ordered = sorted(samples)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def ratio_interval(baseline, current, resamples=BOOTSTRAP_RESAMPLES, confidence=CONFIDENCE, seed=0):
+    # Bootstrap confidence interval for median(current) / median(baseline).
+    # A fixed seed keeps the verdict for a given pair of runs reproducible.
+    rng = random.Random(seed)
+    ratios = []
+    for _ in range(resamples):
+        base = median(rng.choices(baseline, k=len(baseline)))
+        cur = median(rng.choices(current, k=len(current)))
+        ratios.append(cur / base if base > 0 else float("inf"))
+    ratios.sort()
+    tail = (1 - confidence) / 2
+    low = ratios[int(tail * (resamples - 1))]
+    high = ratios[int((1 - tail) * (resamples - 1))]
+    return low, high
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, thresholds=None):
+    # `baseline` and `current` map metric keys to sample lists (ms). A metric
+    # regresses when its median ratio exceeds 1 + threshold and the whole
+    # confidence interval lies above 1, so noise alone doesn't fail the gate.
+    thresholds = thresholds or {}
+    rows = []
+    for key in current:
+        if key not in baseline:
+            continue
+        limit = thresholds.get(key, threshold)
+        base_median = median(baseline[key])
+        current_median = median(current[key])
+        ratio = current_median / base_median if base_median > 0 else float("inf")
+        low, high = ratio_interval(baseline[key], current[key])
+        if ratio > 1 + limit and low > 1:
+            verdict = REGRESSED
+        elif ratio < 1 / (1 + limit) and high < 1:
+            verdict = IMPROVED
+        else:
+            verdict = UNCHANGED
+        rows.append({
+            "metric": key,
+            "baseline_ms": base_median,
+            "current_ms": current_median,
+            "ratio": ratio,
+            "ci": [low, high],
+            "threshold": limit,
+            "verdict": verdict,
+        })
+    return rows
+
+
+def format_table(rows):
+    header = f"{'benchmark':48} {'baseline':>10} {'current':>10} {'change':>8} {'95% CI':>17}  verdict"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        low, high = row["ci"]
+        lines.append(
+            f"{row['metric']:48} {row['baseline_ms']:8.2f}ms {row['current_ms']:8.2f}ms"
+            f" {(row['ratio'] - 1) * 100:+7.1f}% [{(low - 1) * 100:+6.1f}%, {(high - 1) * 100:+6.1f}%]"
+            f"  {row['verdict']}"
+        )
+    return "\n".join(lines)
+
+
+class History:
+    # Benchmark runs keyed by commit and machine fingerprint, oldest first.
+    def __init__(self, path, runs=None):
+        self.path = path
+        self.runs = runs if runs is not None else []
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != HISTORY_VERSION:
+            return cls(path)
+        return cls(path, data.get("runs", []))
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": HISTORY_VERSION, "runs": self.runs}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def record(self, commit, dirty, machine, samples):
+        run = {
+            "commit": commit,
+            "dirty": dirty,
+            "machine": machine,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "samples_ms": samples,
+        }
+        self.runs.append(run)
+        return run
+
+    def baseline(self, machine, commit=None, current=None):
+        # The latest run on this machine: of `commit` when given (a prefix is
+        # enough), else one that `current` (commit, dirty) can be measured
+        # against -- another commit, or a clean run of the same commit when
+        # the working tree is dirty.
+        for run in reversed(self.runs):
+            if run["machine"] != machine:
+                continue
+            if commit is not None:
+                if run["commit"].startswith(commit):
+                    return run
+                continue
+            if current is not None and run["commit"] == current[0] and (run["dirty"] or not current[1]):
+                continue
+            return run
+        return None
+
+
+def run_gate_benchmarks(repeat=DEFAULT_REPEAT, isolate=True):
+    measure_one = measure_isolated if isolate else measure
+    samples = {}
+    for name, shape, _ in GATE_BENCHMARKS:
+        result = measure_one(name, shape, repeat)
+        if "error" in result:
+            raise RuntimeError(f"{metric_key(name, shape)}: {result['error']}")
+        samples[metric_key(name, shape)] = result["samples_ms"]
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench.gate", description="Fail when a tracked benchmark regresses against a stored baseline")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="history file of previous runs")
+    parser.add_argument("--baseline", metavar="COMMIT", help="compare against this commit's latest run (default: the latest run of another commit on this machine)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="fractional slowdown that fails the gate (0.10 = 10%%)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per benchmark")
+    parser.add_argument("--no-isolate", action="store_true", help="run every benchmark in this process")
+    parser.add_argument("--no-record", action="store_true", help="don't add this run to the history")
+    args = parser.parse_args(argv)
+
+    history = History.load(args.history)
+    machine = machine_fingerprint()
+    commit, dirty = current_commit()
+    baseline = history.baseline(machine, args.baseline, current=(commit, dirty))
+    if args.baseline is not None and baseline is None:
+        print(f"No run of {args.baseline} on this machine ({machine}) in {args.history}", file=sys.stderr)
+        return 2
+
+    samples = run_gate_benchmarks(args.repeat, isolate=not args.no_isolate)
+    if not args.no_record:
+        history.record(commit, dirty, machine, samples)
+        history.save()
+
+    label = commit[:12] + (" (dirty)" if dirty else "")
+    if baseline is None:
+        print(f"Recorded {label} on machine {machine}; no baseline to compare against yet")
+        return 0
+
+    thresholds = {
+        metric_key(name, shape): limit for name, shape, limit in GATE_BENCHMARKS if limit is not None
+    }
+    rows = compare(baseline["samples_ms"], samples, args.threshold, thresholds)
+    print(f"Baseline {baseline['commit'][:12]} ({baseline['created']}) vs {label} on machine {machine}")
+    print(format_table(rows))
+    regressed = [row["metric"] for row in rows if row["verdict"] == REGRESSED]
+    if regressed:
+        print(f"{len(regressed)} benchmark(s) regressed: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
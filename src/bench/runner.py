@@ -0,0 +1,239 @@
+import os
+import math
+import time
+import shutil
+import platform
+import resource
+import tempfile
+import multiprocessing
+from contextlib import redirect_stdout
+from build import BuildOptions, build_site
+from block_markdown import BlockType, block_to_block_type, markdown_to_blocks, markdown_to_html_node, scan_blocks
+from gencontent import generate_page, generate_pages_recursive
+from inline_markdown import split_nodes_image, split_nodes_link, text_to_textnodes
+from textnode import TextNode, TextType
+from bench.corpus import SHAPES, generate_corpus, generate_markdown
+
+TEMPLATE = '<!doctype html>\n<html>\n<head><title>{{ Title }}</title><link href="/index.css" rel="stylesheet" /></head>\n<body><article>{{ Content }}</article></body>\n</html>\n'
+
+
+def _paragraphs(markdown):
+    return [
+        " ".join(block.splitlines())
+        for block in markdown_to_blocks(markdown)
+        if block_to_block_type(block) == BlockType.PARAGRAPH
+    ]
+
+
+def _write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def setup_text_to_textnodes(workdir, shape):
+    paragraphs = _paragraphs(generate_markdown(shape)) or ["plain text"]
+    def run():
+        for paragraph in paragraphs:
+            text_to_textnodes(paragraph)
+    return run, len(paragraphs)
+
+
+def setup_markdown_to_blocks(workdir, shape):
+    markdown = generate_markdown(shape)
+    return lambda: markdown_to_blocks(markdown), 1
+
+
+def setup_scan_blocks(workdir, shape):
+    markdown = generate_markdown(shape)
+    return lambda: scan_blocks(markdown), 1
+
+
+def setup_block_to_block_type(workdir, shape):
+    blocks = markdown_to_blocks(generate_markdown(shape))
+    def run():
+        for block in blocks:
+            block_to_block_type(block)
+    return run, len(blocks)
+
+
+def setup_markdown_to_html(workdir, shape):
+    markdown = generate_markdown(shape)
+    return lambda: markdown_to_html_node(markdown).to_html(), 1
+
+
+def setup_generate_page(workdir, shape):
+    source = os.path.join(workdir, "page.md")
+    template = os.path.join(workdir, "template.html")
+    dest = os.path.join(workdir, "out", "index.html")
+    _write(source, generate_markdown(shape))
+    _write(template, TEMPLATE)
+    return lambda: generate_page(source, template, dest, "/site/"), 1
+
+
+def setup_generate_pages_recursive(workdir, shape):
+    content = os.path.join(workdir, "content")
+    template = os.path.join(workdir, "template.html")
+    dest = os.path.join(workdir, "docs")
+    pages = generate_corpus(content, shape)
+    _write(template, TEMPLATE)
+    def run():
+        shutil.rmtree(dest, ignore_errors=True)
+        generate_pages_recursive(content, template, dest, "/site/")
+    return run, len(pages)
+
+
+def setup_build_site(workdir, shape):
+    # A cold build_site run with the CLI's defaults plus compression and
+    # the search index, so every stage (static sync, manifest, dependency
+    # graph, staging swap, search, compression, link check) is timed.
+    content = os.path.join(workdir, "content")
+    static = os.path.join(workdir, "static")
+    template = os.path.join(workdir, "template.html")
+    dest = os.path.join(workdir, "docs")
+    cache = os.path.join(workdir, ".cache")
+    pages = generate_corpus(content, shape)
+    os.makedirs(os.path.join(static, "images"))
+    _write(template, TEMPLATE)
+    _write(os.path.join(static, "index.css"), "body { margin: 0 auto; max-width: 40em; }\n" * 50)
+    with open(os.path.join(static, "images", "logo.gif"), "wb") as f:
+        f.write(b"GIF89a\x40\x00\x20\x00")
+    options = BuildOptions(
+        content_dir=content, static_dir=static, template_path=template, dest_dir=dest, basepath="/site/",
+        cache_dir=cache, atomic=True, compress=True, compress_jobs=1, search_index=True,
+    )
+    def run():
+        shutil.rmtree(dest, ignore_errors=True)
+        shutil.rmtree(cache, ignore_errors=True)
+        build_site(options)
+    return run, len(pages)
+
+
+BENCHMARKS = {
+    "text_to_textnodes": setup_text_to_textnodes,
+    "markdown_to_blocks": setup_markdown_to_blocks,
+    "scan_blocks": setup_scan_blocks,
+    "block_to_block_type": setup_block_to_block_type,
+    "markdown_to_html_node.to_html": setup_markdown_to_html,
+    "generate_page": setup_generate_page,
+    "generate_pages_recursive": setup_generate_pages_recursive,
+    "build_site": setup_build_site,
+}
+
+
+# Links per paragraph for the scaling benchmarks.
+SCALING_SIZES = (10, 100, 1000, 10000, 100000)
+
+SCALING_BENCHMARKS = {
+    "split_nodes_link": (split_nodes_link, "[link {i}](/pages/{i}) and some text "),
+    "split_nodes_image": (split_nodes_image, "![image {i}](/images/{i}.png) and some text "),
+}
+
+
+def measure_scaling(name, sizes=SCALING_SIZES, repeat=5):
+    # Times one call on a single paragraph of each size. The exponent is
+    # the least-squares slope of log(time) against log(size): about 1 for
+    # linear behaviour, 2 for quadratic.
+    split, item = SCALING_BENCHMARKS[name]
+    points = []
+    for size in sizes:
+        nodes = [TextNode("".join(item.format(i=i) for i in range(size)), TextType.TEXT)]
+        split(nodes)
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            split(nodes)
+            samples.append(time.perf_counter() - start)
+        p50 = percentile(samples, 0.5)
+        points.append({"links": size, "p50_ms": p50 * 1000, "ns_per_link": p50 * 1e9 / size})
+    return {"name": name, "repeat": repeat, "points": points, "exponent": _scaling_exponent(points)}
+
+
+def _scaling_exponent(points):
+    xs = [math.log(point["links"]) for point in points]
+    ys = [math.log(max(point["p50_ms"], 1e-9)) for point in points]
+    if len(points) < 2:
+        return None
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+
+def run_scaling(names=None, sizes=SCALING_SIZES, repeat=5):
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "scaling": [measure_scaling(name, sizes, repeat) for name in names or SCALING_BENCHMARKS],
+    }
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(name, shape, repeat):
+    with tempfile.TemporaryDirectory() as workdir, open(os.devnull, "w") as devnull:
+        with redirect_stdout(devnull):
+            run, ops = BENCHMARKS[name](workdir, shape)
+            run()
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                samples.append(time.perf_counter() - start)
+
+    p50 = percentile(samples, 0.5)
+    return {
+        "name": name,
+        "shape": shape,
+        "repeat": repeat,
+        "ops_per_call": ops,
+        "ops_per_sec": ops / p50 if p50 > 0 else None,
+        "p50_ms": p50 * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "samples_ms": [sample * 1000 for sample in samples],
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def _measure_in_child(connection, name, shape, repeat):
+    try:
+        connection.send(measure(name, shape, repeat))
+    except Exception as e:
+        connection.send({"name": name, "shape": shape, "error": f"{type(e).__name__}: {e}"})
+    connection.close()
+
+
+def measure_isolated(name, shape, repeat):
+    # A fresh child per benchmark keeps peak RSS attributable to it.
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return measure(name, shape, repeat)
+    context = multiprocessing.get_context("fork")
+    parent, child = context.Pipe(duplex=False)
+    process = context.Process(target=_measure_in_child, args=(child, name, shape, repeat))
+    process.start()
+    child.close()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def run_benchmarks(names=None, shapes=None, repeat=5, isolate=True):
+    measure_one = measure_isolated if isolate else measure
+    results = []
+    for name in names or BENCHMARKS:
+        for shape in shapes or SHAPES:
+            results.append(measure_one(name, shape, repeat))
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
@@ -1,8 +1,15 @@
+import re
 from enum import Enum
 from htmlnode import ParentNode
 from textnode import TextNode, TextType, text_node_to_html_node
 from inline_markdown import text_to_textnodes
 
+HEADING_TAGS = (None, "h1", "h2", "h3", "h4", "h5", "h6")
+
+_HEADING_RE = re.compile(r"#{1,6} ")
+_ORDERED_ITEM_RE = re.compile(r"\n(\d+)\. ")
+_FENCE_CLOSE_RE = re.compile(r"^[ \t]*```[ \t]*$", re.MULTILINE)
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -12,115 +19,173 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered_list"
 
 def block_to_block_type(markdown):
-    lines = markdown.split("\n")
-    if markdown.startswith("# ") or markdown.startswith("## ") or markdown.startswith("### ") or markdown.startswith("#### ") or markdown.startswith("##### ") or markdown.startswith("###### "):  
-        return BlockType.HEADING
-    elif markdown.startswith("```\n") and markdown.endswith("```"):
-        return BlockType.CODE
-    for line in lines:
-        if not line.startswith(">"):
-            break
-    else:
-        return BlockType.QUOTE
-    for line in lines:
-        if not line.startswith("- "):
-            break
-    else:
-        return BlockType.UNORDERED_LIST 
-    for i, line in enumerate(lines, 1):
-        prefix = f'{i}. '
-        if not line.startswith(prefix):
-            break
-    else:
-        return BlockType.ORDERED_LIST
-    
+    return _classify(markdown, 0, len(markdown))
+
+def _classify(markdown, start, end):
+    # Each block type has its own first character, so one look at it rules
+    # out all but one candidate; the per-line checks then become counts of
+    # "\n" against "\n>" or "\n- " over the block's offsets.
+    first = markdown[start] if start < end else ""
+    if first == "#":
+        if _HEADING_RE.match(markdown, start, end):
+            return BlockType.HEADING
+    elif first == "`":
+        if markdown.startswith("```\n", start, end) and markdown.endswith("```", start, end):
+            return BlockType.CODE
+    elif first == ">":
+        if markdown.count("\n", start, end) == markdown.count("\n>", start, end):
+            return BlockType.QUOTE
+    elif first == "-":
+        if (markdown.startswith("- ", start, end)
+                and markdown.count("\n", start, end) == markdown.count("\n- ", start, end)):
+            return BlockType.UNORDERED_LIST
+    elif first == "1":
+        if _is_ordered_list(markdown, start, end):
+            return BlockType.ORDERED_LIST
     return BlockType.PARAGRAPH
 
-def markdown_to_blocks(markdown):
+def _is_ordered_list(markdown, start, end):
+    if not markdown.startswith("1. ", start, end):
+        return False
+    numbers = _ORDERED_ITEM_RE.findall(markdown, start, end)
+    if len(numbers) != markdown.count("\n", start, end):
+        return False
+    for i, number in enumerate(numbers, 2):
+        if number != str(i):
+            return False
+    return True
+
+def scan_blocks(markdown):
+    # Returns (block_type, start, end) offsets into `markdown`.
+    return [(_classify(markdown, start, end), start, end) for start, end in _block_spans(markdown)]
+
+def _block_spans(markdown):
+    # (start, end) offsets of the blocks. Blocks are separated by blank
+    # lines, except that a fenced code block runs to its closing fence even
+    # when it contains blank lines.
     blocks = []
-    parts = markdown.split("\n\n")
-    for part in parts:
-        block = part.strip()
-        if block != "":
-            blocks.append(block)
+    position = 0
+    length = len(markdown)
+    while position < length:
+        separator = markdown.find("\n\n", position)
+        part_end = length if separator == -1 else separator
+        start, end = _strip_span(markdown, position, part_end)
+        position = part_end + 2
+
+        if start == end:
+            continue
+        if markdown.startswith("```\n", start, end) and markdown.find("```", start + 4, end) == -1:
+            fence = _FENCE_CLOSE_RE.search(markdown, end)
+            if fence is not None:
+                start, end = _strip_span(markdown, start, fence.end())
+                position = fence.end()
+        blocks.append((start, end))
+    return blocks
+
+def _strip_span(markdown, start, end):
+    if start < end and not markdown[start].isspace() and not markdown[end - 1].isspace():
+        return start, end
+    while start < end and markdown[start].isspace():
+        start += 1
+    while end > start and markdown[end - 1].isspace():
+        end -= 1
+    return start, end
+
+def markdown_to_blocks(markdown):
+    # Split-only: unlike scan_blocks, blocks aren't classified. The split
+    # runs in C; only a fence cut open by a blank line needs the offset
+    # walk of _block_spans.
+    blocks = [block for block in (part.strip() for part in markdown.split("\n\n")) if block]
+    if "```" in markdown:
+        for block in blocks:
+            if block.startswith("```\n") and block.find("```", 4) == -1:
+                return [markdown[start:end] for start, end in _block_spans(markdown)]
     return blocks
 
 def text_to_children(text):
-    text_nodes = text_to_textnodes(text)
-    children = []
-    for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
-        children.append(html_node)
-    return children
+    return [text_node_to_html_node(text_node) for text_node in text_to_textnodes(text)]
 
 def markdown_to_html_node(markdown):
+    return blocks_to_html_node(markdown, scan_blocks(markdown))
+
+def blocks_to_html_node(markdown, blocks, text_to_children=text_to_children):
     html_children = []
-    blocks = markdown_to_blocks(markdown)
-    for block in blocks:
-        type_of_block = block_to_block_type(block)
-        if type_of_block == BlockType.PARAGRAPH:
-            content = " ".join(block.splitlines())
-            children = text_to_children(content)
-            html_children.append(ParentNode("p", children))
-
-        elif type_of_block == BlockType.HEADING:
-            level = 0
-            for char in block:
-                if char == "#":
-                    level += 1
-                else:
-                    break
-
-            content = block[level + 1:] 
-            children = text_to_children(content)
-            heading_node = ParentNode(f"h{level}", children)
-            html_children.append(heading_node)
-
-
-        elif type_of_block == BlockType.UNORDERED_LIST:
-            lines = block.split("\n")
-            list_items = []
-            for line in lines:
-                text = line[2:]
-                children = text_to_children(text)
-                list_items.append(ParentNode("li", children))
-            ul_node = ParentNode("ul", list_items)
-            html_children.append(ul_node)
-
-        elif type_of_block == BlockType.ORDERED_LIST:
-            lines = block.split("\n")
-            list_items = []
-            for line in lines:
-                text = line[3:]
-                children = text_to_children(text)
-                list_items.append(ParentNode("li", children))
-            ol_node = ParentNode("ol", list_items)
-            html_children.append(ol_node)
-
-        elif type_of_block == BlockType.CODE:
-            content = block[3:-3].lstrip("\n")
-            child = text_node_to_html_node(TextNode(content, TextType.TEXT))
-            html_children.append(ParentNode("pre", [ParentNode("code", [child])]))
-
-        elif type_of_block == BlockType.QUOTE:
-            lines = block.split("\n")
-            new_lines = []
-            for line in lines:
-                new_lines.append(line.lstrip(">").strip())
-            content = " ".join(new_lines)
-            children = text_to_children(content)
-            quote_node = ParentNode("blockquote", children)
-            html_children.append(quote_node)
-        
+    for type_of_block, start, end in blocks:
+        html_children.append(block_to_html_node(markdown, type_of_block, start, end, text_to_children))
     return ParentNode("div", html_children)
 
-
-
-
-
-
-
-
-
-
-
+def block_to_html_node(markdown, type_of_block, start, end, text_to_children=text_to_children):
+    if type_of_block == BlockType.PARAGRAPH:
+        content = " ".join(markdown[start:end].splitlines())
+        return ParentNode("p", text_to_children(content))
+
+    if type_of_block == BlockType.HEADING:
+        level = 0
+        while markdown[start + level] == "#":
+            level += 1
+        content = markdown[start + level + 1:end]
+        return ParentNode(HEADING_TAGS[level], text_to_children(content))
+
+    if type_of_block == BlockType.UNORDERED_LIST:
+        list_items = []
+        for line in markdown[start:end].split("\n"):
+            list_items.append(ParentNode("li", text_to_children(line[2:])))
+        return ParentNode("ul", list_items)
+
+    if type_of_block == BlockType.ORDERED_LIST:
+        list_items = []
+        for line in markdown[start:end].split("\n"):
+            list_items.append(ParentNode("li", text_to_children(line[3:])))
+        return ParentNode("ol", list_items)
+
+    if type_of_block == BlockType.CODE:
+        content = markdown[start + 3:end - 3].lstrip("\n")
+        child = text_node_to_html_node(TextNode(content, TextType.TEXT))
+        return ParentNode("pre", [ParentNode("code", [child])])
+
+    new_lines = []
+    for line in markdown[start:end].split("\n"):
+        new_lines.append(line.lstrip(">").strip())
+    content = " ".join(new_lines)
+    return ParentNode("blockquote", text_to_children(content))
+
+def iter_blocks(lines):
+    # Incremental scan_blocks over an iterable of lines without their line
+    # endings (e.g. from a file): yields (block_type, text) as soon as the
+    # blank line or closing fence ending a block has been read, so only one
+    # block is held at a time.
+    part = []
+    lines = iter(lines)
+    for line in lines:
+        if line != "":
+            part.append(line)
+            continue
+        if part:
+            yield from _finish_part(part, lines)
+            part = []
+    if part:
+        yield from _finish_part(part, lines)
+
+def _finish_part(part, lines):
+    raw = "\n".join(part)
+    start, end = _strip_span(raw, 0, len(raw))
+    if start == end:
+        return
+    text = raw[start:end]
+    if text.startswith("```\n") and text.find("```", 4) == -1:
+        # An open fence: the block runs on, across blank lines, to the
+        # closing fence. Without one it ends here after all and the lines
+        # read while looking are scanned again.
+        consumed = []
+        for line in lines:
+            consumed.append(line)
+            if _FENCE_CLOSE_RE.fullmatch(line):
+                block = raw[start:] + "\n\n" + "\n".join(consumed)
+                start, end = _strip_span(block, 0, len(block))
+                block = block[start:end]
+                yield _classify(block, 0, len(block)), block
+                return
+        yield _classify(text, 0, len(text)), text
+        yield from iter_blocks(consumed)
+        return
+    yield _classify(text, 0, len(text)), text
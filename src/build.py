@@ -0,0 +1,415 @@
+import io
+import os
+import shutil
+from collections import Counter
+from compress import MIN_SIZE, compress_outputs, remove_variants
+from copystatic import sync_static
+from depgraph import DependencyGraph, extract_references, references_from_blocks, url_for_output
+from fsutil import link_tree, remove_output, staging_path_for, swap_into_place
+from block_markdown import block_to_html_node, markdown_to_html_node
+from gencontent import (
+    PageGenerationError, StreamMode, extract_title, find_pages, generate_pages, read_source, stream_blocks,
+    stream_title,
+)
+from images import ImageIndex
+from manifest import BuildManifest, bytes_hash, file_hash, manifest_path_for
+from parsecache import DEFAULT_MAX_BYTES, ParseCache
+from pipeline import IOPipeline
+from profiling import NULL_PROFILER
+from search import SEARCH_DIR, SearchIndex, page_terms
+from template import load_template
+
+
+# Sources at least this large are parsed and written a block at a time.
+DEFAULT_STREAM_THRESHOLD = 64 * 1024 * 1024
+
+
+class BuildOptions:
+    def __init__(
+        self,
+        content_dir="content",
+        static_dir="static",
+        template_path="template.html",
+        dest_dir="docs",
+        basepath="/",
+        cache_dir=".cache",
+        force=False,
+        explain=False,
+        jobs=1,
+        checksum=False,
+        link_static=False,
+        profiler=None,
+        parse_cache=True,
+        parse_cache_dir=None,
+        parse_cache_size=DEFAULT_MAX_BYTES,
+        pipeline=False,
+        read_ahead=8,
+        write_behind=8,
+        atomic=False,
+        compress=False,
+        compress_min_size=MIN_SIZE,
+        compress_jobs=None,
+        minify=False,
+        image_hints=True,
+        check_links=True,
+        search_index=False,
+        stream_threshold=DEFAULT_STREAM_THRESHOLD,
+        stream_mmap=False,
+        mirrors=(),
+    ):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.cache_dir = cache_dir
+        self.force = force
+        self.explain = explain
+        self.jobs = jobs
+        self.checksum = checksum
+        self.link_static = link_static
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        self.parse_cache = parse_cache
+        self.parse_cache_dir = parse_cache_dir if parse_cache_dir is not None else os.path.join(cache_dir, "parse")
+        self.parse_cache_size = parse_cache_size
+        self.pipeline = pipeline
+        self.read_ahead = read_ahead
+        self.write_behind = write_behind
+        self.atomic = atomic
+        self.compress = compress
+        self.compress_min_size = compress_min_size
+        # Compression threads; gzip and brotli release the GIL, so this is
+        # independent of the page worker count. Defaults to one per CPU.
+        self.compress_jobs = compress_jobs if compress_jobs is not None else os.cpu_count() or 1
+        self.minify = minify
+        self.image_hints = image_hints
+        self.check_links = check_links
+        self.search_index = search_index
+        self.stream_threshold = stream_threshold
+        self.stream_mmap = stream_mmap
+        # Further (basepath, dest_dir) pairs, built from the same parse.
+        self.mirrors = list(mirrors)
+
+    def targets(self):
+        return [(self.basepath, self.dest_dir)] + self.mirrors
+
+
+def build_site(options, changed=None, cancel=None):
+    targets = [_Target(basepath, dest_dir) for basepath, dest_dir in options.targets()]
+    if not options.atomic:
+        failures = _build(options, targets, changed, cancel)
+        with options.profiler.stage("manifest"):
+            for target in targets:
+                target.manifest.save()
+        if failures:
+            raise PageGenerationError(failures)
+        return
+
+    # Build into a hardlinked copy of the live output and swap it in only
+    # when every page succeeded, so the served site is never half-written.
+    for target in targets:
+        target.output_dir = staging_path_for(target.dest_dir)
+        shutil.rmtree(target.output_dir, ignore_errors=True)
+    with options.profiler.stage("staging"):
+        for target in targets:
+            if os.path.isdir(target.dest_dir):
+                link_tree(target.dest_dir, target.output_dir)
+    try:
+        failures = _build(options, targets, changed, cancel)
+        if failures:
+            raise PageGenerationError(failures)
+    except BaseException:
+        for target in targets:
+            shutil.rmtree(target.output_dir, ignore_errors=True)
+        raise
+    with options.profiler.stage("swap"):
+        for target in targets:
+            swap_into_place(target.output_dir, target.dest_dir)
+    with options.profiler.stage("manifest"):
+        for target in targets:
+            target.manifest.save()
+
+
+class _Target:
+    # One basepath/destination pair of a build. Each target keeps its own
+    # manifest and static files; pages are parsed once for all of them.
+    def __init__(self, basepath, dest_dir):
+        self.basepath = basepath
+        self.dest_dir = dest_dir
+        # The destination itself or its staging copy.
+        self.output_dir = dest_dir
+        self.manifest = None
+        self.graph = None
+        self.removed = []
+        # Distinguishes the targets' log lines when there are several.
+        self.label = ""
+
+    def dest_for(self, dest, dest_dir):
+        # Relocates a page path from under another target's dest_dir.
+        if dest_dir == self.dest_dir:
+            return dest
+        return os.path.join(self.dest_dir, os.path.relpath(dest, dest_dir))
+
+    def output_path(self, dest):
+        # The manifest always records paths under dest_dir.
+        if self.output_dir == self.dest_dir:
+            return dest
+        return os.path.join(self.output_dir, os.path.relpath(dest, self.dest_dir))
+
+
+def _build(options, targets, changed, cancel):
+    # The first target drives planning: its page paths are relocated into
+    # the others, and a page stale in any target is rendered into all of
+    # them from a single parse.
+    primary = targets[0]
+    if len(targets) > 1:
+        for target in targets:
+            target.label = f" in {target.dest_dir}"
+
+    # With `changed` set (watch mode), only pages and assets under those paths
+    # are looked at; everything else is trusted to match the manifest.
+    if changed is not None:
+        changed = set(os.path.normpath(path) for path in changed)
+        if _is_affected(options.template_path, changed):
+            changed = None
+
+    for target in targets:
+        os.makedirs(target.output_dir, exist_ok=True)
+        target.manifest = BuildManifest.load(manifest_path_for(options.cache_dir, target.dest_dir))
+
+    profiler = options.profiler
+    if changed is None or _is_affected(options.static_dir, changed, either_way=True):
+        for target in targets:
+            with profiler.stage("static"):
+                synced = sync_static(
+                    options.static_dir, target.output_dir, target.manifest.assets,
+                    checksum=options.checksum, link=options.link_static,
+                )
+            target.manifest.assets = synced.files
+            if profiler.enabled:
+                copied_bytes = sum(
+                    os.path.getsize(os.path.join(target.output_dir, path)) for path in synced.copied
+                )
+                profiler.add_bytes(copied_bytes, copied_bytes)
+            print(
+                f"Static files{target.label}: {len(synced.copied)} copied, {synced.unchanged} unchanged, "
+                f"{len(synced.removed)} removed"
+            )
+
+    with profiler.stage("plan"):
+        # Compiling up front reports template errors once instead of per page.
+        load_template(options.template_path, options.minify)
+        pages = find_pages(options.content_dir, primary.dest_dir)
+        template_hash = file_hash(options.template_path)
+
+        images = None
+        resized = set()
+        if options.image_hints:
+            # Only headers of new or modified images are read; the rest come
+            # from the index saved by the previous build.
+            images = ImageIndex.load(os.path.join(options.cache_dir, "images.json"))
+            resized = images.refresh(options.static_dir)
+            images.save()
+        for target in targets:
+            target.graph = DependencyGraph(target.manifest.graph)
+        stream = None
+        if options.stream_threshold is not None:
+            stream = StreamMode(options.stream_threshold, options.stream_mmap)
+
+        for target in targets:
+            target.removed = target.manifest.removed_sources(src for src, _ in pages)
+            for source in target.removed:
+                entry = target.manifest.forget(source)
+                if options.explain:
+                    print(f"Removing {entry['dest']}: source {source} was deleted")
+                remove_output(target.output_path(entry["dest"]), target.output_dir)
+        removed = primary.removed
+
+        stale = []
+        source_hashes = {}
+        references = {}
+        plan_failures = []
+        for src, dest in pages:
+            # A page depends on the sizes of the images it embedded last
+            # time; if its source changed it is rebuilt regardless.
+            embedded = primary.graph.images_of(src)
+            if changed is not None and not _is_affected(src, changed):
+                if embedded is None or resized.isdisjoint(embedded):
+                    continue
+            try:
+                # Streamed sources are hashed in chunks; the rest are read
+                # once here for both the hash and the references.
+                data = None if stream is not None and stream.applies(src) else _read_bytes(src)
+                source_hash = file_hash(src) if data is None else bytes_hash(data)
+            except OSError as e:
+                print(f"Error generating {src}: {e}")
+                plan_failures.append((src, e))
+                continue
+            reason = "forced rebuild" if options.force else None
+            for target in targets:
+                if reason is not None:
+                    break
+                reason = target.manifest.rebuild_reason(
+                    src, target.dest_for(dest, primary.dest_dir), source_hash, options.template_path,
+                    template_hash, target.basepath, options.minify,
+                    _image_fingerprint(images, target.graph.images_of(src)),
+                )
+            if reason is None:
+                continue
+            if options.explain:
+                print(f"Rebuilding {src}: {reason}")
+            try:
+                references[src] = _page_references(src, data, url_for_output(dest, primary.dest_dir), stream)
+            except Exception as e:
+                # Reported like a page that failed to render; the rest of
+                # the build goes ahead.
+                print(f"Error generating {src}: {e}")
+                plan_failures.append((src, e))
+                continue
+            stale.append((src, primary.output_path(dest)))
+            source_hashes[src] = source_hash
+
+    parse_cache = None
+    if options.parse_cache:
+        parse_cache = ParseCache(options.parse_cache_dir, options.parse_cache_size)
+
+    pipeline = None
+    if options.pipeline:
+        pipeline = IOPipeline(options.read_ahead, options.write_behind)
+
+    mirrors = tuple((target.basepath, primary.output_dir, target.output_dir) for target in targets[1:])
+    # Rendered pages hand back their search terms; only unchanged pages
+    # missing from an index are read again for it.
+    entries = {} if options.search_index else None
+    with profiler.stage("pages"):
+        page_failures = generate_pages(
+            stale, options.template_path, primary.basepath, options.jobs, cancel, profiler,
+            parse_cache, pipeline, options.minify, images, stream, mirrors, entries,
+        )
+    failures = plan_failures + page_failures
+    failed = set(src for src, _ in failures)
+
+    if options.search_index:
+        for target in targets:
+            with profiler.stage("search"):
+                search = SearchIndex.load(manifest_path_for(options.cache_dir, target.dest_dir, "search"))
+                # Without the previous state or output every shard is rewritten.
+                rewrite_all = not search.pages or not os.path.isfile(
+                    os.path.join(target.output_dir, SEARCH_DIR, "index.json")
+                )
+                shards = set()
+                for source in target.removed:
+                    shards |= search.forget(source)
+                indexed = 0
+                for src, dest in pages:
+                    if src in failed or (src not in source_hashes and src in search.pages):
+                        continue
+                    url = target.basepath + url_for_output(dest, primary.dest_dir)[1:]
+                    if src not in entries:
+                        entries[src] = _page_search_entry(src, stream)
+                    title, terms = entries[src]
+                    shards |= search.update(src, url, title, terms)
+                    indexed += 1
+                written = search.write(target.output_dir, None if rewrite_all else shards)
+                search.save()
+            print(f"Search index{target.label}: {indexed} pages indexed, {written} shards written")
+
+    if options.compress:
+        for target in targets:
+            with profiler.stage("compress"):
+                compressed = compress_outputs(
+                    target.output_dir, target.manifest.compressed, options.compress_min_size, options.compress_jobs
+                )
+            target.manifest.compressed = compressed.files
+            saved = compressed.bytes_saved()
+            for extension, amount in saved.items():
+                profiler.count(f"bytes_saved{extension}", amount)
+            savings = ", ".join(f"{extension} saves {amount} bytes" for extension, amount in sorted(saved.items()))
+            print(
+                f"Compressed files{target.label}: {len(compressed.compressed)} compressed, "
+                f"{compressed.unchanged} unchanged, {len(compressed.skipped)} skipped"
+                + (f"; {savings}" if savings else "")
+            )
+    else:
+        for target in targets:
+            if not target.manifest.compressed:
+                continue
+            # Left behind, the variants would be served in place of pages
+            # rebuilt since compression was turned off.
+            with profiler.stage("compress"):
+                remove_variants(target.output_dir, target.manifest.compressed)
+            print(f"Compressed files{target.label}: removed variants of {len(target.manifest.compressed)} files")
+            target.manifest.compressed = {}
+
+    with profiler.stage("manifest"):
+        for target in targets:
+            for src, dest in pages:
+                if src not in source_hashes or src in failed:
+                    continue
+                dest = target.dest_for(dest, primary.dest_dir)
+                target.manifest.record(
+                    src, dest, source_hashes[src], options.template_path, template_hash, target.basepath,
+                    file_hash(target.output_path(dest)), options.minify,
+                    _image_fingerprint(images, references[src]["images"]),
+                )
+                target.graph.update(src, references[src])
+        evicted = 0
+        if parse_cache is not None and stale:
+            evicted, freed = parse_cache.trim()
+
+    if evicted:
+        print(f"Parse cache: evicted {evicted} entries ({freed} bytes)")
+
+    print(f"Generated {len(stale) - len(page_failures)} of {len(pages)} pages, removed {len(removed)}")
+
+    if options.check_links:
+        # Every target holds the same pages and assets, so one check covers
+        # them all.
+        with profiler.stage("links"):
+            outputs = set(url_for_output(dest, primary.dest_dir) for _, dest in pages)
+            outputs.update("/" + path.replace(os.sep, "/") for path in primary.manifest.assets)
+            broken = primary.graph.broken_links(outputs)
+        for src, path in broken:
+            print(f"Broken link in {src}: {path}")
+        profiler.count("broken_links", len(broken))
+        print(f"Link check: {len(broken)} broken links in {len(pages)} pages")
+    return failures
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _page_references(src, data, page_url, stream):
+    # `data` is the source's bytes, or None for a streamed source.
+    if data is None:
+        return references_from_blocks(stream_blocks(src, stream.use_mmap), page_url)
+    # Decoded as read_source would: locale encoding, universal newlines.
+    return extract_references(io.TextIOWrapper(io.BytesIO(data)).read(), page_url)
+
+
+def _page_search_entry(src, stream):
+    if stream is not None and stream.applies(src):
+        terms = Counter()
+        for block_type, text in stream_blocks(src, stream.use_mmap):
+            terms.update(page_terms(block_to_html_node(text, block_type, 0, len(text))))
+        return stream_title(src, stream.use_mmap), dict(terms)
+    markdown = read_source(src)
+    return extract_title(markdown), page_terms(markdown_to_html_node(markdown))
+
+
+def _image_fingerprint(images, urls):
+    if images is None or urls is None:
+        return None
+    return images.fingerprint(urls)
+
+
+def _is_affected(path, changed, either_way=False):
+    path = os.path.normpath(path)
+    for changed_path in changed:
+        if path == changed_path or path.startswith(changed_path + os.sep):
+            return True
+        if either_way and changed_path.startswith(path + os.sep):
+            return True
+    return False
@@ -0,0 +1,138 @@
+import os
+import gzip
+from concurrent.futures import ThreadPoolExecutor
+from fsutil import remove_output
+from manifest import bytes_hash, file_hash
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg", ".json")
+VARIANT_EXTENSIONS = (".gz", ".br")
+MIN_SIZE = 1024
+
+UNCHANGED = "unchanged"
+COMPRESSED = "compressed"
+SKIPPED = "skipped"
+
+
+def _gzip(data):
+    # mtime=0 keeps the output reproducible for identical input.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+def available_encoders():
+    encoders = [(".gz", _gzip)]
+    if brotli is not None:
+        encoders.append((".br", _brotli))
+    return encoders
+
+
+class CompressResult:
+    def __init__(self, files, compressed, skipped, removed):
+        self.files = files
+        self.compressed = compressed
+        self.skipped = skipped
+        self.removed = removed
+
+    @property
+    def unchanged(self):
+        return len(self.files) - len(self.compressed) - len(self.skipped)
+
+    def bytes_saved(self):
+        # Per variant extension, over every compressed file in the output,
+        # not only those compressed by this build.
+        saved = {}
+        for entry in self.files.values():
+            for extension, size in entry["variants"].items():
+                saved[extension] = saved.get(extension, 0) + entry["size"] - size
+        return saved
+
+    def __repr__(self):
+        return (
+            f"CompressResult({len(self.compressed)} compressed, {len(self.skipped)} skipped, "
+            f"{self.unchanged} unchanged, {len(self.removed)} removed)"
+        )
+
+
+def compress_outputs(root, previous=None, min_size=MIN_SIZE, threads=None):
+    # `previous` maps relative paths to the entries returned by the last run
+    # (size, mtime, content hash and variant sizes), so files that weren't
+    # rewritten -- or were rewritten with the same bytes -- are skipped.
+    previous = previous if previous is not None else {}
+    encoders = available_encoders()
+    paths = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                paths.append(os.path.relpath(os.path.join(directory, name), root))
+
+    def compress_one(relative_path):
+        path = os.path.join(root, relative_path)
+        return _compress_file(path, previous.get(relative_path), encoders, min_size)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(compress_one, paths))
+
+    files = {}
+    compressed = []
+    skipped = []
+    for relative_path, (entry, status) in zip(paths, results):
+        files[relative_path] = entry
+        if status == COMPRESSED:
+            compressed.append(relative_path)
+        elif status == SKIPPED:
+            skipped.append(relative_path)
+
+    removed = sorted(relative_path for relative_path in previous if relative_path not in files)
+    remove_variants(root, removed)
+    return CompressResult(files, compressed, skipped, removed)
+
+
+def remove_variants(root, relative_paths):
+    # Deletes the compressed variants of the given outputs, e.g. every one
+    # recorded by the last build when compression has been turned off.
+    for relative_path in relative_paths:
+        for extension in VARIANT_EXTENSIONS:
+            remove_output(os.path.join(root, relative_path + extension), root)
+
+
+def _compress_file(path, entry, encoders, min_size):
+    stat = os.stat(path)
+    if entry is not None and entry["size"] == stat.st_size and _variants_present(path, entry):
+        if entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry, UNCHANGED
+        # Rewritten, but possibly with the same bytes (e.g. a forced rebuild).
+        if entry["hash"] == file_hash(path):
+            return dict(entry, mtime_ns=stat.st_mtime_ns), UNCHANGED
+
+    with open(path, "rb") as f:
+        data = f.read()
+    variants = {}
+    if len(data) >= min_size:
+        for extension, encode in encoders:
+            encoded = encode(data)
+            if len(encoded) >= len(data):
+                continue
+            tmp_path = path + extension + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(encoded)
+            os.replace(tmp_path, path + extension)
+            variants[extension] = len(encoded)
+
+    for extension in VARIANT_EXTENSIONS:
+        if extension not in variants and os.path.exists(path + extension):
+            os.remove(path + extension)
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": bytes_hash(data), "variants": variants}
+    return entry, COMPRESSED if variants else SKIPPED
+
+
+def _variants_present(path, entry):
+    return all(os.path.exists(path + extension) for extension in entry["variants"])
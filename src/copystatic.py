@@ -1,5 +1,8 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from fsutil import remove_output
+from manifest import file_hash
 
 source_path = "static"
 filename = "index.css"
@@ -14,10 +17,106 @@ def copy_files_recursive(source_path, dest_path):
         if os.path.isfile(from_path):
             copy = shutil.copy(from_path, to_path)
         else:
-            print("It's a directory") 
-            os.mkdir(to_path)
+            print("It's a directory")
+            os.makedirs(to_path, exist_ok=True)
             copy_files_recursive(from_path, to_path)
 
 
+class SyncResult:
+    def __init__(self, files, copied, removed):
+        self.files = files
+        self.copied = copied
+        self.removed = removed
 
-    
+    @property
+    def unchanged(self):
+        return len(self.files) - len(self.copied)
+
+    def __repr__(self):
+        return f"SyncResult({len(self.copied)} copied, {self.unchanged} unchanged, {len(self.removed)} removed)"
+
+
+def sync_static(source_path, dest_path, previous=(), checksum=False, link=False, threads=None):
+    files = []
+    for directory, dirnames, filenames in os.walk(source_path):
+        dirnames.sort()
+        relative_dir = os.path.relpath(directory, source_path)
+        os.makedirs(os.path.join(dest_path, relative_dir), exist_ok=True)
+        for name in sorted(filenames):
+            files.append(os.path.normpath(os.path.join(relative_dir, name)))
+
+    def sync_one(relative_path):
+        from_path = os.path.join(source_path, relative_path)
+        to_path = os.path.join(dest_path, relative_path)
+        if _is_unchanged(from_path, to_path, checksum):
+            return False
+        if link and _link_file(from_path, to_path):
+            return True
+        _copy_file(from_path, to_path)
+        return True
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        changed = list(executor.map(sync_one, files))
+    copied = [relative_path for relative_path, was_copied in zip(files, changed) if was_copied]
+
+    current = set(files)
+    removed = sorted(relative_path for relative_path in previous if relative_path not in current)
+    for relative_path in removed:
+        remove_output(os.path.join(dest_path, relative_path), dest_path)
+
+    return SyncResult(files, copied, removed)
+
+
+def _is_unchanged(from_path, to_path, checksum):
+    try:
+        dest_stat = os.stat(to_path)
+    except FileNotFoundError:
+        return False
+    source_stat = os.stat(from_path)
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if source_stat.st_ino == dest_stat.st_ino and source_stat.st_dev == dest_stat.st_dev:
+        return True
+    if checksum:
+        return file_hash(from_path) == file_hash(to_path)
+    return source_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+
+def _link_file(from_path, to_path):
+    tmp_path = to_path + ".tmp"
+    try:
+        os.link(from_path, tmp_path)
+    except OSError:
+        # Different filesystem, or links not supported: fall back to a copy.
+        return False
+    os.replace(tmp_path, to_path)
+    return True
+
+
+def _copy_file(from_path, to_path):
+    # Copy into a temporary name and rename over the destination, so the new
+    # file never shares an inode with an older hardlinked copy.
+    tmp_path = to_path + ".tmp"
+    with open(from_path, "rb") as fsrc, open(tmp_path, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        try:
+            _copy_file_range(fsrc.fileno(), fdst.fileno(), size)
+        except OSError:
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst)
+    shutil.copystat(from_path, tmp_path)
+    os.replace(tmp_path, to_path)
+
+
+def _copy_file_range(fd_in, fd_out, size):
+    copy = getattr(os, "copy_file_range", None)
+    if copy is None:
+        copy = lambda fd_in, fd_out, count: os.sendfile(fd_out, fd_in, None, count)
+    remaining = size
+    while remaining > 0:
+        sent = copy(fd_in, fd_out, remaining)
+        if sent == 0:
+            break
+        remaining -= sent
@@ -0,0 +1,92 @@
+import re
+import os
+import posixpath
+from urllib.parse import unquote, urlsplit
+from block_markdown import BlockType, scan_blocks
+from inline_markdown import extract_markdown_images, extract_markdown_links
+
+_CODE_SPAN_RE = re.compile(r"`[^`\n]*`")
+
+
+def extract_references(markdown, page_url):
+    # The root-relative paths of the internal links and images in a page,
+    # in source order and without duplicates. Code blocks and code spans are
+    # skipped, since a link written there is shown, not followed.
+    blocks = ((block_type, markdown[start:end]) for block_type, start, end in scan_blocks(markdown))
+    return references_from_blocks(blocks, page_url)
+
+
+def references_from_blocks(blocks, page_url):
+    # extract_references over (block_type, text) pairs, e.g. a streamed page.
+    links = {}
+    images = {}
+    for block_type, text in blocks:
+        if block_type is BlockType.CODE:
+            continue
+        if "`" in text:
+            text = _CODE_SPAN_RE.sub("", text)
+        for _, url in extract_markdown_links(text):
+            path = resolve_url(url, page_url)
+            if path is not None:
+                links[path] = None
+        for _, url in extract_markdown_images(text):
+            path = resolve_url(url, page_url)
+            if path is not None:
+                images[path] = None
+    return {"links": list(links), "images": list(images)}
+
+
+def resolve_url(url, page_url):
+    # Maps a link target to a root-relative path, or None when it points off
+    # the site (another scheme or host) or only at a fragment of the page.
+    parts = urlsplit(url.strip())
+    if parts.scheme or parts.netloc or parts.path == "":
+        return None
+    path = unquote(parts.path)
+    if not path.startswith("/"):
+        path = posixpath.join(posixpath.dirname(page_url), path)
+    resolved = posixpath.normpath(path)
+    if path.endswith("/") and resolved != "/":
+        resolved += "/"
+    return resolved
+
+
+def url_for_output(dest, dest_dir):
+    return "/" + os.path.relpath(dest, dest_dir).replace(os.sep, "/")
+
+
+class DependencyGraph:
+    # Page -> page and page -> asset edges, keyed by source path. Each page
+    # maps to the paths it links to and the images it embeds, as returned
+    # by extract_references.
+    def __init__(self, references=None):
+        self.references = references if references is not None else {}
+
+    def update(self, source, references):
+        self.references[source] = references
+
+    def forget(self, source):
+        self.references.pop(source, None)
+
+    def images_of(self, source):
+        entry = self.references.get(source)
+        return entry["images"] if entry is not None else None
+
+    def broken_links(self, outputs):
+        # One pass over every edge against the set of root-relative paths the
+        # build produces. Returns (source, path) pairs that resolve to nothing.
+        broken = []
+        for source in sorted(self.references):
+            entry = self.references[source]
+            for path in entry["links"] + entry["images"]:
+                if not _resolves(path, outputs):
+                    broken.append((source, path))
+        return broken
+
+
+def _resolves(path, outputs):
+    if path in outputs:
+        return True
+    if path.endswith("/"):
+        return path + "index.html" in outputs
+    return path + ".html" in outputs or path + "/index.html" in outputs
@@ -0,0 +1,88 @@
+import os
+import errno
+import shutil
+import ctypes
+import ctypes.util
+
+
+def remove_output(path, root):
+    if os.path.isfile(path) or os.path.islink(path):
+        os.remove(path)
+    root = os.path.abspath(root)
+    directory = os.path.dirname(os.path.abspath(path))
+    while directory != root and directory.startswith(root + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+
+def staging_path_for(dest_dir):
+    return os.path.normpath(dest_dir) + ".staging"
+
+
+def link_tree(source, dest):
+    # Recreates `source` under `dest` with every file hardlinked, so an
+    # unchanged file costs a link instead of a copy. Anything written into
+    # `dest` must replace files (write to a temporary name and rename), never
+    # modify them in place, or the change would show through in `source`.
+    linked = 0
+    for directory, dirnames, filenames in os.walk(source):
+        target = os.path.join(dest, os.path.relpath(directory, source))
+        os.makedirs(target, exist_ok=True)
+        for name in filenames:
+            from_path = os.path.join(directory, name)
+            to_path = os.path.join(target, name)
+            try:
+                os.link(from_path, to_path, follow_symlinks=False)
+            except OSError:
+                shutil.copy2(from_path, to_path, follow_symlinks=False)
+            linked += 1
+    return linked
+
+
+AT_FDCWD = -100
+RENAME_EXCHANGE = 1 << 1
+
+_renameat2 = None
+
+
+def exchange_paths(first, second):
+    # Atomically swaps two paths with renameat2(RENAME_EXCHANGE). Returns
+    # False when the kernel, libc or filesystem can't do it.
+    global _renameat2
+    if _renameat2 is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            _renameat2 = libc.renameat2
+        except (OSError, AttributeError):
+            _renameat2 = False
+        else:
+            _renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    if _renameat2 is False:
+        return False
+    result = _renameat2(AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE)
+    if result == 0:
+        return True
+    error = ctypes.get_errno()
+    if error in (errno.EINVAL, errno.ENOSYS, errno.ENOTSUP):
+        return False
+    raise OSError(error, os.strerror(error), first)
+
+
+def swap_into_place(staging, dest):
+    # Moves the finished `staging` tree to `dest`. With RENAME_EXCHANGE there
+    # is no moment at which `dest` is missing; the fallback has a window of
+    # two renames.
+    if not os.path.exists(dest):
+        os.rename(staging, dest)
+        return
+    if exchange_paths(staging, dest):
+        shutil.rmtree(staging)
+        return
+    old = os.path.normpath(dest) + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    os.rename(dest, old)
+    os.rename(staging, dest)
+    shutil.rmtree(old)
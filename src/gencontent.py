@@ -1,40 +1,535 @@
+import io
 import os
+import json
+import mmap
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from htmlnode import HTMLNode
-from block_markdown import markdown_to_html_node
+from htmlnode import HTMLNode, basepath_needs_quotes
+from images import annotate_images
+from inline_markdown import extract_markdown_images
+from block_markdown import (
+    block_to_html_node, blocks_to_html_node, iter_blocks, markdown_to_html_node, scan_blocks, text_to_children,
+)
+from profiling import PageTimer
+from search import page_terms
+from template import load_template
+
+_NO_STAGE = nullcontext()
 
 def extract_title(markdown):
-    lines = markdown.split("\n")
+    return _title_from_lines(markdown.split("\n"))
+
+def _title_from_lines(lines):
     for line in lines:
         stripped_line = line.strip()
         if stripped_line.startswith("# "):  
             return stripped_line[2:].strip()
     raise Exception("No header in MD.")
 
-def generate_page(from_path, template_path, dest_path, basepath):
+class PageGenerationError(Exception):
+    def __init__(self, failures):
+        self.failures = failures
+        lines = [f"{len(failures)} page(s) failed to generate:"]
+        for from_path, error in failures:
+            lines.append(f" * {from_path}: {error}")
+        super().__init__("\n".join(lines))
+
+class BuildCancelled(Exception):
+    pass
+
+def generate_page(
+    from_path, template_path, dest_path, basepath, parse_cache=None, minify=False, images=None, stream=None
+):
     print(f'Generating page from {from_path} to {dest_path} using {template_path}')
+    render_page(
+        from_path, template_path, dest_path, basepath,
+        parse_cache=parse_cache, minify=minify, images=images, stream=stream,
+    )
+
+def render_page(
+    from_path, template_path, dest_path, basepath, profile=False, parse_cache=None, minify=False, images=None,
+    stream=None, mirrors=(),
+):
+    return _render_page(
+        from_path, template_path, dest_path, basepath, profile, parse_cache, minify, images, stream, mirrors, False
+    )[0]
+
+def _render_page(
+    from_path, template_path, dest_path, basepath, profile, parse_cache, minify, images, stream, mirrors, search
+):
+    # render_page for the drivers: returns (timings, search entry), the
+    # entry being the page's (title, term counts) when `search` is set so
+    # the search index doesn't have to parse the page again.
+    if mirrors:
+        return _render_page_outputs(
+            from_path, template_path, page_outputs(dest_path, basepath, mirrors), profile, parse_cache, minify,
+            images, stream, search,
+        )
+    if stream is not None and stream.applies(from_path):
+        timer = PageTimer() if profile else None
+        entry = stream_page(
+            from_path, template_path, dest_path, basepath, minify, images, stream.use_mmap, timer, search
+        )
+        return (timer.as_dict() if timer is not None else None), entry
+    if profile:
+        return _render_page_profiled(
+            from_path, template_path, dest_path, basepath, parse_cache, minify, images, search
+        )
 
     with open(from_path, 'r') as f:
         markdown = f.read()
-    with open(template_path, 'r') as f:
-        template = f.read()
+    template = load_template(template_path, minify)
 
     title = extract_title(markdown)
-    html_content = markdown_to_html_node(markdown).to_html()
-
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html_content)
+    tree = None
+    root = _cached_html(parse_cache, markdown, minify, basepath, images)
+    if root is None:
+        root = tree = _build_tree(markdown, images)
 
-    page_html = template.replace('href="/', f'href="{basepath}')
-    page_html = page_html.replace('src="/', f'src="{basepath}')
-        
     dest_dir = os.path.dirname(dest_path)
 
     if dest_dir != "":
         os.makedirs(dest_dir, exist_ok=True)
 
-    with open(dest_path, "w") as f:
-        f.write(page_html)
+    # Replace rather than overwrite: the old output may be a hardlink shared
+    # with the live site (see fsutil.link_tree).
+    tmp_path = dest_path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            template.render(f, Title=title, Content=root, basepath=basepath)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, dest_path)
+    return None, (_search_entry(markdown, title, tree, parse_cache) if search else None)
+
+# Cached bodies must not depend on the basepath, so they are serialized
+# with this marker in its place and the marker is replaced on use. Sources
+# containing the marker themselves bypass the cache. Under minify the
+# marker also decides whether root-relative URLs stay quoted, so basepaths
+# that need quotes get a marker that does too.
+_BASEPATH_MARKER = "\0"
+_QUOTED_BASEPATH_MARKER = "\0 "
+
+def _basepath_marker(minify, basepath):
+    if minify and basepath_needs_quotes(basepath):
+        return _QUOTED_BASEPATH_MARKER
+    return _BASEPATH_MARKER
+
+def _build_tree(markdown, images):
+    root = markdown_to_html_node(markdown)
+    if images is not None:
+        annotate_images(root, images)
+    return root
+
+def _cache_variant(minify, images, markdown, marker=_BASEPATH_MARKER):
+    variant = "minified" if minify else ""
+    if marker == _QUOTED_BASEPATH_MARKER:
+        variant += ":quoted"
+    if images is not None:
+        # Only the sizes of the images this page embeds, so adding or
+        # resizing an image doesn't invalidate every other cached body.
+        urls = set(url for _, url in extract_markdown_images(markdown))
+        variant += f":images={images.fingerprint(urls)}"
+    return variant
+
+def _cached_html(parse_cache, markdown, minify, basepath, images):
+    marker = _basepath_marker(minify, basepath)
+    body = _cached_body(parse_cache, markdown, minify, marker, images)
+    return body.replace(marker, basepath) if body is not None else None
+
+def _cached_body(parse_cache, markdown, minify, marker, images):
+    if parse_cache is None or _BASEPATH_MARKER in markdown:
+        return None
+
+    def to_body(markdown):
+        return _build_tree(markdown, images).to_html(minify, marker)
+
+    return parse_cache.render(markdown, to_body, _cache_variant(minify, images, markdown, marker))
+
+def _search_entry(markdown, title, tree, parse_cache):
+    # Terms come from the page's tree when it was parsed for this render. A
+    # cached body has none, so the terms are cached next to it.
+    def to_terms(markdown):
+        return page_terms(tree if tree is not None else markdown_to_html_node(markdown))
+
+    if parse_cache is None or _BASEPATH_MARKER in markdown:
+        return title, to_terms(markdown)
+    cached = parse_cache.render(markdown, lambda markdown: json.dumps(to_terms(markdown)), "search")
+    return title, json.loads(cached)
+
+def page_outputs(dest_path, basepath, mirrors):
+    # The (basepath, path) pairs a page is written to: its own, then one
+    # per mirror, a (basepath, from_dir, to_dir) triple that relocates
+    # dest_path from under from_dir to under to_dir.
+    outputs = [(basepath, dest_path)]
+    for mirror_basepath, from_dir, to_dir in mirrors:
+        outputs.append((mirror_basepath, os.path.join(to_dir, os.path.relpath(dest_path, from_dir))))
+    return outputs
+
+def _render_page_outputs(
+    from_path, template_path, outputs, profile, parse_cache, minify, images, stream, search=False
+):
+    timer = PageTimer() if profile else None
+    if stream is not None and stream.applies(from_path):
+        # Streaming holds nothing between blocks, so each output re-reads.
+        entry = None
+        for i, (basepath, dest_path) in enumerate(outputs):
+            page_entry = stream_page(
+                from_path, template_path, dest_path, basepath, minify, images, stream.use_mmap, timer,
+                search and i == 0,
+            )
+            if i == 0:
+                entry = page_entry
+    else:
+        markdown = read_source(from_path, timer)
+        basepaths = [basepath for basepath, _ in outputs]
+        rendered, entry = render_source_variants(
+            markdown, template_path, basepaths, parse_cache, timer, minify, images, search
+        )
+        for (_, dest_path), page_bytes in zip(outputs, rendered):
+            write_output(dest_path, page_bytes, timer)
+    return (timer.as_dict() if timer is not None else None), entry
+
+def _render_page_profiled(
+    from_path, template_path, dest_path, basepath, parse_cache=None, minify=False, images=None, search=False
+):
+    # Same steps as render_page, but materialised one stage at a time so
+    # each can be timed on its own.
+    timer = PageTimer()
+    markdown = read_source(from_path, timer)
+    page_bytes, entry = _render_source_profiled(
+        markdown, template_path, basepath, parse_cache, timer, minify, images, search
+    )
+    write_output(dest_path, page_bytes, timer)
+    return timer.as_dict(), entry
+
+# read_source, render_source and write_output split a page build into its
+# I/O and CPU halves, so a driver can run them on different executors.
+# Each takes an optional PageTimer and records its stages into it.
+
+def read_source(from_path, timer=None):
+    with timer.stage("read") if timer is not None else _NO_STAGE:
+        with open(from_path, 'r') as f:
+            markdown = f.read()
+            if timer is not None:
+                timer.bytes_read = os.fstat(f.fileno()).st_size
+    return markdown
+
+def render_source(markdown, template_path, basepath, parse_cache=None, timer=None, minify=False, images=None):
+    if timer is not None:
+        return _render_source_profiled(markdown, template_path, basepath, parse_cache, timer, minify, images)[0]
+
+    template = load_template(template_path, minify)
+    title = extract_title(markdown)
+    content = _cached_html(parse_cache, markdown, minify, basepath, images)
+    if content is None:
+        content = _build_tree(markdown, images)
+    out = io.StringIO()
+    template.render(out, Title=title, Content=content, basepath=basepath)
+    return out.getvalue().encode("utf-8")
+
+def render_source_variants(
+    markdown, template_path, basepaths, parse_cache=None, timer=None, minify=False, images=None, search=False
+):
+    # render_source for several basepaths from a single parse: the body is
+    # serialized once with the basepath marker, which is all that differs
+    # between the variants. Returns the pages and, when `search` is set,
+    # the search entry (see _render_page).
+    with timer.stage("template") if timer is not None else _NO_STAGE:
+        template = load_template(template_path, minify)
+    with timer.stage("blocks") if timer is not None else _NO_STAGE:
+        title = extract_title(markdown)
+    markers = [_basepath_marker(minify, basepath) for basepath in basepaths]
+    with timer.stage("tree") if timer is not None else _NO_STAGE:
+        if _BASEPATH_MARKER in markdown:
+            tree = _build_tree(markdown, images)
+            bodies = dict.fromkeys(markers, tree)
+        else:
+            bodies = {}
+            tree = None
+            for marker in markers:
+                if marker in bodies:
+                    continue
+                body = _cached_body(parse_cache, markdown, minify, marker, images)
+                if body is None:
+                    if tree is None:
+                        tree = _build_tree(markdown, images)
+                    body = tree.to_html(minify, marker)
+                bodies[marker] = body
+    rendered = []
+    with timer.stage("template") if timer is not None else _NO_STAGE:
+        for basepath, marker in zip(basepaths, markers):
+            body = bodies[marker]
+            content = body.replace(marker, basepath) if isinstance(body, str) else body
+            out = io.StringIO()
+            template.render(out, Title=title, Content=content, basepath=basepath)
+            rendered.append(out.getvalue().encode("utf-8"))
+    entry = None
+    if search:
+        with timer.stage("terms") if timer is not None else _NO_STAGE:
+            entry = _search_entry(markdown, title, tree, parse_cache)
+    return rendered, entry
+
+def _render_source_profiled(markdown, template_path, basepath, parse_cache, timer, minify, images, search=False):
+    marker = _basepath_marker(minify, basepath)
+    variant = _cache_variant(minify, images, markdown, marker)
+    with timer.stage("template"):
+        template = load_template(template_path, minify)
+
+    with timer.stage("blocks"):
+        title = extract_title(markdown)
+    content = None
+    root = None
+    if parse_cache is not None and _BASEPATH_MARKER in markdown:
+        parse_cache = None
+    if parse_cache is not None:
+        with timer.stage("parse_cache"):
+            body = parse_cache.get(markdown, variant)
+            if body is not None:
+                content = body.replace(marker, basepath)
+    if content is None:
+        with timer.stage("blocks"):
+            blocks = scan_blocks(markdown)
+        with timer.stage("tree"):
+            root = blocks_to_html_node(markdown, blocks, timer.timed("inline", text_to_children))
+        tree_wall, tree_cpu = timer.stages["tree"]
+        inline_wall, inline_cpu = timer.stages.get("inline", (0.0, 0.0))
+        timer.stages["tree"] = [tree_wall - inline_wall, tree_cpu - inline_cpu]
+        if images is not None:
+            with timer.stage("images"):
+                annotate_images(root, images)
+
+        if parse_cache is None:
+            with timer.stage("to_html"):
+                content = root.to_html(minify, basepath)
+        else:
+            with timer.stage("to_html"):
+                body = root.to_html(minify, marker)
+            with timer.stage("parse_cache"):
+                parse_cache.put(markdown, body, variant)
+                content = body.replace(marker, basepath)
+    with timer.stage("template"):
+        out = io.StringIO()
+        template.render(out, Title=title, Content=content, basepath=basepath)
+        page_bytes = out.getvalue().encode("utf-8")
+    entry = None
+    if search:
+        with timer.stage("terms"):
+            entry = _search_entry(markdown, title, root, parse_cache)
+    return page_bytes, entry
+
+def write_output(dest_path, page_bytes, timer=None):
+    with timer.stage("write") if timer is not None else _NO_STAGE:
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir != "":
+            os.makedirs(dest_dir, exist_ok=True)
+        tmp_path = dest_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(page_bytes)
+        os.replace(tmp_path, dest_path)
+    if timer is not None:
+        timer.bytes_written += len(page_bytes)
+
+class StreamMode:
+    # Pages of at least `threshold` bytes are rendered by stream_page rather
+    # than parsed whole, optionally reading the source through mmap.
+    def __init__(self, threshold, use_mmap=False):
+        self.threshold = threshold
+        self.use_mmap = use_mmap
+
+    def applies(self, from_path):
+        return os.path.getsize(from_path) >= self.threshold
+
+def iter_source_lines(from_path, use_mmap=False):
+    # The source's lines without line endings, read incrementally.
+    if use_mmap and os.path.getsize(from_path) > 0:
+        with open(from_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b""):
+                yield line.decode("utf-8").rstrip("\r\n")
+        return
+    with open(from_path, 'r') as f:
+        for line in f:
+            yield line.rstrip("\n")
+
+def stream_blocks(from_path, use_mmap=False):
+    return iter_blocks(iter_source_lines(from_path, use_mmap))
+
+def stream_title(from_path, use_mmap=False):
+    return _title_from_lines(iter_source_lines(from_path, use_mmap))
+
+class _StreamedContent:
+    # Stands in for a page's root node in Template.render: each block is
+    # parsed, written and dropped before the next is read, so memory is
+    # bounded by the largest block rather than the document.
+    def __init__(self, blocks, images, terms=None):
+        self.blocks = blocks
+        self.images = images
+        # A Counter to add each block's search terms to, if any.
+        self.terms = terms
+
+    def write_html(self, sink, minify=False, basepath="/"):
+        sink.write("<div>")
+        first = True
+        for block_type, text in self.blocks:
+            node = block_to_html_node(text, block_type, 0, len(text))
+            if self.images is not None:
+                first = annotate_images(node, self.images, first)
+            if self.terms is not None:
+                self.terms.update(page_terms(node))
+            node.write_html(sink, minify, basepath)
+        sink.write("</div>")
+
+def stream_page(
+    from_path, template_path, dest_path, basepath, minify=False, images=None, use_mmap=False, timer=None,
+    search=False,
+):
+    # Same output as render_page, written while the source is read. The
+    # title takes a first pass that stops at the first heading. Returns the
+    # page's search entry when `search` is set, else None.
+    with timer.stage("template") if timer is not None else _NO_STAGE:
+        template = load_template(template_path, minify)
+    with timer.stage("stream") if timer is not None else _NO_STAGE:
+        title = stream_title(from_path, use_mmap)
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir != "":
+            os.makedirs(dest_dir, exist_ok=True)
+        tmp_path = dest_path + ".tmp"
+        terms = Counter() if search else None
+        content = _StreamedContent(stream_blocks(from_path, use_mmap), images, terms)
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                template.render(f, Title=title, Content=content, basepath=basepath)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, dest_path)
+    if timer is not None:
+        timer.bytes_read = os.path.getsize(from_path)
+        timer.bytes_written += os.path.getsize(dest_path)
+    return (title, dict(terms)) if search else None
+
+def find_pages(dir_path_content, dest_dir_path):
+    pages = []
+    for entry in sorted(os.listdir(dir_path_content)):
+        src = os.path.join(dir_path_content, entry)
+        dst = os.path.join(dest_dir_path, entry)
+
+        if os.path.isfile(src) and entry.endswith(".md"):
+            pages.append((src, os.path.splitext(dst)[0] + ".html"))
+        elif os.path.isdir(src):
+            pages.extend(find_pages(src, dst))
+    return pages
+
+def generate_pages(
+    pages, template_path, basepath, jobs=1, cancel=None, profiler=None, parse_cache=None, pipeline=None,
+    minify=False, images=None, stream=None, mirrors=(), search_entries=None,
+):
+    # `pipeline` is an optional driver object (see pipeline.IOPipeline) that
+    # replaces the serial and process-pool drivers below. Each page is also
+    # written for every mirror (see page_outputs) from the same parse. If
+    # `search_entries` is a dict, each page's (title, term counts) is stored
+    # in it by source path, taken from the render's own parse.
+    profile = profiler is not None and profiler.enabled
+    search = search_entries is not None
+    if pipeline is not None:
+        results = pipeline.run(
+            pages, template_path, basepath, jobs, cancel, profile, parse_cache, minify, images, stream, mirrors,
+            search,
+        )
+    elif jobs > 1 and len(pages) > 1:
+        results = _generate_pages_parallel(
+            pages, template_path, basepath, jobs, cancel, profile, parse_cache, minify, images, stream, mirrors,
+            search,
+        )
+    else:
+        results = _generate_pages_serial(
+            pages, template_path, basepath, cancel, profile, parse_cache, minify, images, stream, mirrors, search
+        )
+
+    failures = []
+    for (from_path, dest_path), (error, timings, entry) in zip(pages, results):
+        if error is not None:
+            failures.append((from_path, error))
+            continue
+        if profile:
+            profiler.record_page(from_path, timings)
+        if search:
+            search_entries[from_path] = entry
+    return failures
+
+def _generate_pages_serial(
+    pages, template_path, basepath, cancel, profile, parse_cache, minify, images, stream, mirrors, search
+):
+    results = []
+    for from_path, dest_path in pages:
+        if cancel is not None and cancel.is_set():
+            raise BuildCancelled()
+        print(f'Generating page from {from_path} to {dest_path} using {template_path}')
+        try:
+            timings, entry = _render_page(
+                from_path, template_path, dest_path, basepath, profile, parse_cache, minify, images, stream, mirrors,
+                search,
+            )
+        except Exception as e:
+            print(f"Error generating {from_path}: {e}")
+            results.append((e, None, None))
+        else:
+            results.append((None, timings, entry))
+    return results
+
+# The image index of a worker process. A process pool installs it once
+# per worker (see install_worker_images) instead of pickling the whole
+# index into every page task; tasks then pass images=None.
+_worker_images = None
+
+def install_worker_images(images):
+    global _worker_images
+    _worker_images = images
+
+def worker_images(images=None):
+    return images if images is not None else _worker_images
+
+def _render_page_in_worker(
+    from_path, template_path, dest_path, basepath, profile, parse_cache, minify, stream, mirrors, search
+):
+    return _render_page(
+        from_path, template_path, dest_path, basepath, profile, parse_cache, minify, worker_images(), stream,
+        mirrors, search,
+    )
+
+def _generate_pages_parallel(
+    pages, template_path, basepath, jobs, cancel, profile, parse_cache, minify, images, stream, mirrors, search
+):
+    # Largest sources first so a single huge page doesn't finish last on its own.
+    order = sorted(range(len(pages)), key=lambda i: os.path.getsize(pages[i][0]), reverse=True)
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=install_worker_images, initargs=(images,)
+    ) as executor:
+        futures = [None] * len(pages)
+        for i in order:
+            from_path, dest_path = pages[i]
+            futures[i] = executor.submit(
+                _render_page_in_worker, from_path, template_path, dest_path, basepath, profile, parse_cache,
+                minify, stream, mirrors, search,
+            )
+
+        for (from_path, dest_path), future in zip(pages, futures):
+            if cancel is not None and cancel.is_set():
+                executor.shutdown(cancel_futures=True)
+                raise BuildCancelled()
+            print(f'Generating page from {from_path} to {dest_path} using {template_path}')
+            try:
+                timings, entry = future.result()
+            except Exception as e:
+                print(f"Error generating {from_path}: {e}")
+                results.append((e, None, None))
+            else:
+                results.append((None, timings, entry))
+    return results
 
 def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
     for entry in os.listdir(dir_path_content):
@@ -1,52 +1,166 @@
 
+import re
+
+# Whitespace as HTML defines it; \s would also match non-breaking spaces.
+_WHITESPACE_RE = re.compile(r"[ \t\n\r\f]+")
+_UNQUOTED_VALUE_RE = re.compile(r"[^ \t\n\r\f\"'=<>`{}]+")
+
+# Elements whose text is rendered (or executed) as written.
+PRESERVE_WHITESPACE_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+
+# Attributes whose root-relative values ("/...") get the basepath prefix.
+URL_ATTRIBUTES = frozenset(("href", "src"))
+
+
+def collapse_whitespace(text):
+    return _WHITESPACE_RE.sub(" ", text)
+
+
+def apply_basepath(name, value, basepath):
+    value = str(value)
+    # "//host/..." is protocol-relative, not root-relative.
+    if name in URL_ATTRIBUTES and value.startswith("/") and not value.startswith("//"):
+        return basepath + value[1:]
+    return value
+
+
+def basepath_needs_quotes(basepath):
+    # A minified root-relative href/src starts with the basepath, so it can
+    # only go unquoted if the basepath could.
+    return _UNQUOTED_VALUE_RE.fullmatch(basepath) is None
+
+
+def minify_attribute(name, value):
+    value = str(value)
+    if value == "":
+        return f" {name}"
+    if _UNQUOTED_VALUE_RE.fullmatch(value):
+        return f" {name}={value}"
+    return f' {name}="{value}"'
+
+
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def to_html(self, minify=False, basepath="/"):
+        chunks = []
+        self.write_html(chunks, minify, basepath)
+        return "".join(chunks)
+
+    def write_html(self, sink, minify=False, basepath="/"):
+        write = sink.append if isinstance(sink, list) else sink.write
+        if minify:
+            self._write_minified(write, basepath)
+        else:
+            self._write_html(write, basepath)
+
+    def _write_html(self, write, basepath="/"):
         raise NotImplementedError
 
-    def props_to_html(self):
+    def _write_minified(self, write, basepath="/"):
+        raise NotImplementedError
+
+    def iter_html(self, basepath="/"):
+        raise NotImplementedError
+
+    def props_to_html(self, basepath="/"):
         if self.props is None:
             return ""
         props_html = ""
         for prop in self.props:
-            props_html += f' {prop}="{self.props[prop]}"'
+            value = self.props[prop]
+            if basepath != "/":
+                value = apply_basepath(prop, value, basepath)
+            props_html += f' {prop}="{value}"'
         return props_html
 
+    def _minified_props(self, basepath):
+        if self.props is None:
+            return ""
+        return "".join(
+            minify_attribute(prop, apply_basepath(prop, value, basepath)) for prop, value in self.props.items()
+        )
+
     def __repr__(self):
         return f'HTMLNode: {self.tag}, {self.value}, {self.children}, {self.props}'
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
-        super().__init__(tag, value, None, props)
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+    def _write_html(self, write, basepath="/"):
+        if self.value is None:
+            raise ValueError("No value")
+        if self.tag is None:
+            write(self.value)
+        else:
+            props = self.props_to_html(basepath)
+            write(f'<{self.tag}{props}>{self.value}</{self.tag}>')
 
-    def to_html(self):
+    def _write_minified(self, write, basepath="/"):
         if self.value is None:
             raise ValueError("No value")
+        value = self.value if self.tag in PRESERVE_WHITESPACE_TAGS else collapse_whitespace(self.value)
         if self.tag is None:
-            return self.value
+            write(value)
         else:
-            props = self.props_to_html()
-            return f'<{self.tag}{props}>{self.value}</{self.tag}>'
+            write(f'<{self.tag}{self._minified_props(basepath)}>{value}</{self.tag}>')
+
+    def iter_html(self, basepath="/"):
+        chunks = []
+        self._write_html(chunks.append, basepath)
+        yield from chunks
 
     def __repr__(self):
         return f'LeafNode({self.tag}, {self.value}, {self.props})'
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        super().__init__(tag, None, children, props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
 
-    def to_html(self):
+    def _check(self):
         if self.tag is None:
             raise ValueError("No tag found")
         if self.children is None:
             raise ValueError("Children is missing a value")
-        child_html = ""
+
+    def _write_html(self, write, basepath="/"):
+        self._check()
+        write(f'<{self.tag}{self.props_to_html(basepath)}>')
+        for child in self.children:
+            child._write_html(write, basepath)
+        write(f'</{self.tag}>')
+
+    def _write_minified(self, write, basepath="/"):
+        self._check()
+        write(f'<{self.tag}{self._minified_props(basepath)}>')
+        if self.tag in PRESERVE_WHITESPACE_TAGS:
+            for child in self.children:
+                child._write_html(write, basepath)
+        else:
+            for child in self.children:
+                child._write_minified(write, basepath)
+        write(f'</{self.tag}>')
+
+    def iter_html(self, basepath="/"):
+        self._check()
+        yield f'<{self.tag}{self.props_to_html(basepath)}>'
         for child in self.children:
-            child_html += child.to_html()
-        props = self.props_to_html()
-        return f'<{self.tag}{props}>{child_html}</{self.tag}>'
+            yield from child.iter_html(basepath)
+        yield f'</{self.tag}>'
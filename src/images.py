@@ -0,0 +1,185 @@
+import os
+import json
+import struct
+import hashlib
+from htmlnode import LeafNode
+
+IMAGE_INDEX_VERSION = 1
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+# JPEG start-of-frame markers carry the dimensions; C4, C8 and CC share the
+# range but are other segment types.
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_image_size(path):
+    # Reads just enough of the file header to find the intrinsic size.
+    # Returns (width, height), or None for anything unrecognised.
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return _webp_size(head)
+        if head[:2] == b"\xff\xd8":
+            return _jpeg_size(f)
+    return None
+
+
+def _webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 " and len(head) >= 30:
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(head) >= 25:
+        b0, b1, b2, b3 = head[21:25]
+        return 1 + (b0 | (b1 & 0x3F) << 8), 1 + (b1 >> 6 | b2 << 2 | (b3 & 0x0F) << 10)
+    if chunk == b"VP8X" and len(head) >= 30:
+        return 1 + int.from_bytes(head[24:27], "little"), 1 + int.from_bytes(head[27:30], "little")
+    return None
+
+
+def _jpeg_size(f):
+    # Walks the segment headers, seeking over their payloads (EXIF blocks can
+    # be tens of kilobytes), until a start-of-frame segment.
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        while marker[1] == 0xFF:
+            marker = marker[1:] + f.read(1)
+            if len(marker) < 2:
+                return None
+        code = marker[1]
+        if code == 0xD9 or code == 0xDA:
+            return None
+        if 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if code in _JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+class ImageIndex:
+    # Intrinsic sizes of the images under a static directory, keyed by the
+    # root-relative URL they are served at ("/images/x.png").
+    def __init__(self, path, entries=None):
+        self.path = path
+        self.entries = entries if entries is not None else {}
+        self._fingerprint = None
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != IMAGE_INDEX_VERSION:
+            return cls(path)
+        return cls(path, data.get("images", {}))
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": IMAGE_INDEX_VERSION, "images": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self, static_dir):
+        # Re-reads only images whose mtime or size changed. Returns the URLs
+        # whose dimensions changed, appeared or disappeared.
+        entries = {}
+        for directory, dirnames, filenames in os.walk(static_dir):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(directory, name)
+                url = "/" + os.path.relpath(path, static_dir).replace(os.sep, "/")
+                stat = os.stat(path)
+                entry = self.entries.get(url)
+                if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+                    try:
+                        size = read_image_size(path)
+                    except (OSError, struct.error):
+                        size = None
+                    if size is None:
+                        continue
+                    entry = [stat.st_mtime_ns, stat.st_size, size[0], size[1]]
+                entries[url] = entry
+
+        changed = set(
+            url for url in entries.keys() | self.entries.keys()
+            if _dimensions(entries.get(url)) != _dimensions(self.entries.get(url))
+        )
+        self.entries = entries
+        self._fingerprint = None
+        return changed
+
+    def size_of(self, src):
+        entry = self.entries.get(src)
+        if entry is None:
+            return None
+        return entry[2], entry[3]
+
+    def fingerprint(self, urls=None):
+        # Of the dimensions of `urls` (every indexed image by default), so a
+        # page can record the sizes it was rendered with.
+        if urls is not None:
+            return _fingerprint((url, self.size_of(url)) for url in sorted(urls))
+        if self._fingerprint is None:
+            self._fingerprint = _fingerprint((url, self.size_of(url)) for url in sorted(self.entries))
+        return self._fingerprint
+
+
+def _fingerprint(sizes):
+    digest = hashlib.blake2b(digest_size=8)
+    for url, size in sizes:
+        digest.update(f"{url}\0{size}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _dimensions(entry):
+    return None if entry is None else (entry[2], entry[3])
+
+
+def annotate_images(root, index, first=True):
+    # Adds intrinsic dimensions and loading hints to every <img> in the tree.
+    # The first image is likely above the fold, so it is fetched eagerly at
+    # high priority; the rest are lazy. Pass first=False for a tree that
+    # continues a page (a streamed block); the return value says whether
+    # the page's first image is still to come.
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, LeafNode):
+            if node.tag != "img":
+                continue
+            props = dict(node.props or {})
+            size = index.size_of(props.get("src")) if index is not None else None
+            if size is not None:
+                props["width"] = str(size[0])
+                props["height"] = str(size[1])
+            if first:
+                props["fetchpriority"] = "high"
+                first = False
+            else:
+                props["loading"] = "lazy"
+            props["decoding"] = "async"
+            node.props = props
+        elif node.children:
+            stack.extend(reversed(node.children))
+    return first
@@ -19,71 +19,127 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
                     new_nodes.append(TextNode(section, text_type))
     return new_nodes
 
+_IMAGE_RE = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+_LINK_RE = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
 def extract_markdown_images(text):
-    matches = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
-    return matches
+    return _IMAGE_RE.findall(text)
 
 def extract_markdown_links(text):
-    matches = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
-    return matches
+    return _LINK_RE.findall(text)
 
 def split_nodes_image(old_nodes):
+    return _split_nodes_matching(old_nodes, _IMAGE_RE, TextType.IMAGE)
+
+def split_nodes_link(old_nodes):
+    return _split_nodes_matching(old_nodes, _LINK_RE, TextType.LINK)
+
+def _split_nodes_matching(old_nodes, pattern, text_type):
+    # Walks the match spans, so each node's text is sliced once per match
+    # instead of re-split (and copied) from every match to its end.
     new_nodes = []
     for node in old_nodes:
         if node.text_type != TextType.TEXT:
             new_nodes.append(node)
             continue
 
-        images = extract_markdown_images(node.text)
-        if len(images) == 0:
-            new_nodes.append(node)
-            continue
+        text = node.text
+        position = 0
+        for match in pattern.finditer(text):
+            start = match.start()
+            if start > position:
+                new_nodes.append(TextNode(text[position:start], TextType.TEXT))
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            position = match.end()
 
-        remaining = node.text
-        for image_alt, image_link in images:
-            token = f"![{image_alt}]({image_link})"
-            before, remaining = remaining.split(token, 1)
-        
-            if before != "":
-                new_nodes.append(TextNode(before, TextType.TEXT))
-            new_nodes.append(TextNode(image_alt, TextType.IMAGE, image_link))
-        
-        if remaining != "":
-            new_nodes.append(TextNode(remaining, TextType.TEXT))
+        if position == 0:
+            new_nodes.append(node)
+        elif position < len(text):
+            new_nodes.append(TextNode(text[position:], TextType.TEXT))
 
     return new_nodes
 
-def split_nodes_link(old_nodes):
-    new_nodes = []
-    for node in old_nodes:
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-            continue
+# One token per delimiter, image or link. Every alternative starts with a
+# literal character, which lets the regex engine skip ahead to the next
+# candidate instead of trying each alternative at every position.
+_INLINE_TOKEN_RE = re.compile(
+    r"(\*\*|_|`"
+    r"|!\[([^\[\]]*)\]\(([^()]*)\)"
+    r"|\[([^\[\]]*)\]\(([^()]*)\))"
+)
+# The same tokens, but link and image bodies exclude the delimiters, which
+# the multi-pass pipeline always split on first. The nested quantifiers make
+# it several times slower, so it only rescans text where a link or image
+# found by _INLINE_TOKEN_RE turns out to contain a delimiter.
+_STRICT_INLINE_TOKEN_RE = re.compile(
+    r"(\*\*|_|`"
+    r"|!\[([^\[\]_`*]*(?:\*(?!\*)[^\[\]_`*]*)*)\]\(([^()_`*]*(?:\*(?!\*)[^()_`*]*)*)\)"
+    r"|\[([^\[\]_`*]*(?:\*(?!\*)[^\[\]_`*]*)*)\]\(([^()_`*]*(?:\*(?!\*)[^()_`*]*)*)\))"
+)
 
-        links = extract_markdown_links(node.text)
-        if len(links) == 0:
-            new_nodes.append(node)
+_DELIMITER_TYPES = {"**": TextType.BOLD, "_": TextType.ITALIC, "`": TextType.CODE}
+
+def text_to_textnodes(text):
+    if text == "":
+        return []
+    if "**" not in text and "_" not in text and "`" not in text:
+        if "[" not in text:
+            return [TextNode(text, TextType.TEXT)]
+        # Links and images only: no delimiter can fall inside their bodies.
+        return _scan_inline(_INLINE_TOKEN_RE.split(text))
+    nodes = _scan_inline(_INLINE_TOKEN_RE.split(text), check_bodies=True)
+    if nodes is None:
+        nodes = _scan_inline(_STRICT_INLINE_TOKEN_RE.split(text))
+    return nodes
+
+def _scan_inline(parts, check_bodies=False):
+    # `parts` is a token pattern's split(): [text, token, image label, image
+    # url, link label, link url, text, ...]. The pending text of the current
+    # span is buffered in `pending`. With check_bodies, returns None on a
+    # link or image containing a delimiter, for a rescan with the strict
+    # pattern.
+    TEXT = TextType.TEXT
+    nodes = []
+    append = nodes.append
+    state = TEXT
+    pending = parts[0]
+    for i in range(1, len(parts), 6):
+        token = parts[i]
+        delimiter_type = _DELIMITER_TYPES.get(token)
+
+        if delimiter_type is None:
+            if check_bodies and ("_" in token or "`" in token or "**" in token):
+                return None
+            if state is TEXT:
+                if pending:
+                    append(TextNode(pending, TEXT))
+                if parts[i + 1] is not None:
+                    append(TextNode(parts[i + 1], TextType.IMAGE, parts[i + 2]))
+                else:
+                    append(TextNode(parts[i + 3], TextType.LINK, parts[i + 4]))
+                pending = parts[i + 5]
+            else:
+                pending += token + parts[i + 5]
             continue
 
-        remaining = node.text
-        for link_text, link_link in links:
-            token = f"[{link_text}]({link_link})"
-            before, remaining = remaining.split(token, 1)
-        
-            if before != "":
-                new_nodes.append(TextNode(before, TextType.TEXT))
-            new_nodes.append(TextNode(link_text, TextType.LINK, link_link))
-        
-        if remaining != "":
-            new_nodes.append(TextNode(remaining, TextType.TEXT))
+        if state is TEXT:
+            next_state = delimiter_type
+        elif state is delimiter_type:
+            next_state = TEXT
+        elif state is TextType.BOLD or (state is TextType.ITALIC and delimiter_type is TextType.CODE):
+            # Literal inside an outer span, e.g. `_` within bold.
+            pending += token + parts[i + 5]
+            continue
+        else:
+            raise Exception("Invalid markdown: missing closing delimiter")
 
-    return new_nodes
+        if pending:
+            append(TextNode(pending, state))
+        state = next_state
+        pending = parts[i + 5]
 
-def text_to_textnodes(text):
-    nodes = [TextNode(text,TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    if state is not TEXT:
+        raise Exception("Invalid markdown: missing closing delimiter")
+    if pending:
+        append(TextNode(pending, TEXT))
     return nodes
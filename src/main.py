@@ -1,28 +1,111 @@
-import sys
 import os
-import shutil
-from textnode import TextNode, TextType
-from htmlnode import HTMLNode
-from copystatic import copy_files_recursive
-from gencontent import extract_title, generate_page, generate_pages_recursive
+import sys
+import argparse
+from build import BuildOptions, build_site
+from gencontent import PageGenerationError
+from profiling import BuildProfiler, load_hook
+from server import serve_site
+from template import TemplateError
+from watch import watch_site
+
+def parse_target(value):
+    basepath, separator, dest_dir = value.partition("=")
+    if not separator or not basepath or not dest_dir:
+        raise argparse.ArgumentTypeError(f"expected BASEPATH=DIR, got {value!r}")
+    return basepath, dest_dir
 
 def main():
+    parser = argparse.ArgumentParser(description="Build the static site into ./docs")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--target", action="append", default=[], type=parse_target, metavar="BASEPATH=DIR", help="also build the site for BASEPATH into DIR, from the same parse (repeatable)")
+    parser.add_argument("--force", action="store_true", help="rebuild every page even if the manifest says it is up to date")
+    parser.add_argument("--explain", action="store_true", help="print why each page is rebuilt or removed")
+    parser.add_argument("--cache-dir", default=".cache", help="where the build manifest is kept")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes for page generation")
+    parser.add_argument("--checksum", action="store_true", help="compare static files by content hash instead of mtime")
+    parser.add_argument("--link-static", action="store_true", help="hardlink static files into ./docs when on the same filesystem")
+    parser.add_argument("--parse-cache-dir", help="where parsed page bodies are cached; can be shared between builds (default: <cache-dir>/parse)")
+    parser.add_argument("--parse-cache-size", type=int, default=256, metavar="MB", help="evict least recently used parse cache entries above this size")
+    parser.add_argument("--no-parse-cache", action="store_true", help="always parse Markdown from scratch")
+    parser.add_argument("--pipeline", action="store_true", help="overlap source reads and output writes with rendering (helps on slow or network storage)")
+    parser.add_argument("--read-ahead", type=int, default=8, metavar="N", help="pages read and rendered ahead with --pipeline")
+    parser.add_argument("--write-behind", type=int, default=8, metavar="N", help="rendered pages queued for writing with --pipeline")
+    parser.add_argument("--in-place", action="store_true", help="write into ./docs directly instead of building a staging copy and swapping it in (always the case with --watch)")
+    parser.add_argument("--compress", action="store_true", help="write .gz (and .br with the brotli module) next to HTML, CSS, JS, SVG and JSON outputs")
+    parser.add_argument("--compress-min-size", type=int, default=1024, metavar="BYTES", help="don't compress outputs smaller than this")
+    parser.add_argument("--compress-jobs", type=int, metavar="N", help="compression threads for --compress (default: one per CPU)")
+    parser.add_argument("--minify", action="store_true", help="collapse insignificant whitespace and drop optional attribute quotes in the output")
+    parser.add_argument("--no-image-hints", dest="image_hints", action="store_false", help="don't add image dimensions and loading hints to <img> tags")
+    parser.add_argument("--no-link-check", dest="check_links", action="store_false", help="don't check internal links and images against the generated site")
+    parser.add_argument("--search-index", action="store_true", help="write a sharded full-text search index to <dest>/search/")
+    parser.add_argument("--stream-threshold", type=int, default=64, metavar="MB", help="parse and write sources of at least this size a block at a time to bound memory (0 streams every page)")
+    parser.add_argument("--mmap", action="store_true", help="read streamed sources through mmap")
+    parser.add_argument("--watch", action="store_true", help="rebuild on changes and serve ./docs with live reload")
+    parser.add_argument("--serve", action="store_true", help="serve ./docs as it is, without building (keep-alive, ETag/304, precompressed variants)")
+    parser.add_argument("--port", type=int, default=8888, help="preview server port for --watch and --serve")
+    parser.add_argument("--profile", nargs="?", const="", metavar="REPORT", help="time each build stage and write a JSON report (default: <cache-dir>/build-report.json)")
+    parser.add_argument("--profile-top", type=int, default=10, help="number of slowest pages listed in the report")
+    parser.add_argument("--profile-hook", action="append", default=[], metavar="MODULE:FUNCTION", help="call FUNCTION(stage, page, wall, cpu) for every recorded timing")
+    args = parser.parse_args()
+    dest_dirs = [os.path.normpath(dest_dir) for dest_dir in ["./docs"] + [dest_dir for _, dest_dir in args.target]]
+    if len(set(dest_dirs)) != len(dest_dirs):
+        parser.error("each --target needs its own output directory")
+
+    profiler = None
+    if args.profile is not None:
+        profiler = BuildProfiler([load_hook(spec) for spec in args.profile_hook])
 
-    dir_path_static = "./static"
-    dir_path_docs = "./docs"
-    
-    basepath = "/"
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+    options = BuildOptions(
+        dest_dir="./docs",
+        static_dir="./static",
+        basepath=args.basepath,
+        cache_dir=args.cache_dir,
+        force=args.force,
+        explain=args.explain,
+        jobs=args.jobs,
+        checksum=args.checksum,
+        link_static=args.link_static,
+        profiler=profiler,
+        parse_cache=not args.no_parse_cache,
+        parse_cache_dir=args.parse_cache_dir,
+        parse_cache_size=args.parse_cache_size * 1024 * 1024,
+        pipeline=args.pipeline,
+        read_ahead=args.read_ahead,
+        write_behind=args.write_behind,
+        # In watch mode the preview server is the only reader, and staging
+        # would relink the whole output tree on every save.
+        atomic=not args.in_place and not args.watch,
+        compress=args.compress,
+        compress_min_size=args.compress_min_size,
+        compress_jobs=args.compress_jobs,
+        minify=args.minify,
+        image_hints=args.image_hints,
+        check_links=args.check_links,
+        search_index=args.search_index,
+        stream_threshold=args.stream_threshold * 1024 * 1024,
+        stream_mmap=args.mmap,
+        mirrors=args.target,
+    )
 
-    if os.path.exists(dir_path_docs):
-        shutil.rmtree(dir_path_docs)
+    if args.watch:
+        watch_site(options, args.port)
+        return
 
-    os.mkdir(dir_path_docs)
+    if args.serve:
+        serve_site(options.dest_dir, args.port)
+        return
 
-    copy_files_recursive(dir_path_static, dir_path_docs)
- 
     print("Generating page...")
-    generate_pages_recursive("content", "template.html", "docs", basepath)
+    try:
+        build_site(options)
+    except (PageGenerationError, TemplateError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if profiler is not None:
+            report_path = args.profile or os.path.join(args.cache_dir, "build-report.json")
+            profiler.write_report(report_path, args.profile_top)
+            print(f"Build report written to {report_path}")
 
-main()
+if __name__ == "__main__":
+    main()
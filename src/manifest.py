@@ -0,0 +1,107 @@
+import os
+import json
+import hashlib
+
+MANIFEST_VERSION = 1
+
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bytes_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def manifest_path_for(cache_dir, dest_dir, kind="manifest"):
+    # `kind` names other per-destination state kept next to the manifest.
+    name = os.path.normpath(dest_dir).strip(os.sep).replace(os.sep, "_") or "root"
+    return os.path.join(cache_dir, f"{kind}-{name}.json")
+
+
+class BuildManifest:
+    def __init__(self, path, pages=None, assets=None, compressed=None, graph=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        self.assets = assets if assets is not None else []
+        self.compressed = compressed if compressed is not None else {}
+        # Source path -> references, see depgraph.DependencyGraph.
+        self.graph = graph if graph is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(
+            path, data.get("pages", {}), data.get("assets", []), data.get("compressed", {}), data.get("graph", {})
+        )
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            data = {
+                "version": MANIFEST_VERSION,
+                "pages": self.pages,
+                "assets": self.assets,
+                "compressed": self.compressed,
+                "graph": self.graph,
+            }
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def rebuild_reason(
+        self, source, dest, source_hash, template_path, template_hash, basepath, minify=False, images=None
+    ):
+        entry = self.pages.get(source)
+        if entry is None:
+            return "new page"
+        if entry["dest"] != dest:
+            return "output path changed"
+        if entry["source_hash"] != source_hash:
+            return "source changed"
+        if entry["template"] != template_path or entry["template_hash"] != template_hash:
+            return f"template {template_path} changed"
+        if entry["basepath"] != basepath:
+            return f"basepath changed from {entry['basepath']} to {basepath}"
+        if entry.get("minify", False) != minify:
+            return "minify turned on" if minify else "minify turned off"
+        if entry.get("images") != images:
+            return "image dimensions changed"
+        if not os.path.isfile(dest):
+            return "output missing"
+        return None
+
+    def record(
+        self, source, dest, source_hash, template_path, template_hash, basepath, output_hash, minify=False,
+        images=None,
+    ):
+        self.pages[source] = {
+            "dest": dest,
+            "source_hash": source_hash,
+            "template": template_path,
+            "template_hash": template_hash,
+            "basepath": basepath,
+            "output_hash": output_hash,
+            "minify": minify,
+            "images": images,
+        }
+
+    def forget(self, source):
+        self.graph.pop(source, None)
+        return self.pages.pop(source, None)
+
+    def removed_sources(self, sources):
+        current = set(sources)
+        return sorted(source for source in self.pages if source not in current)
@@ -0,0 +1,107 @@
+import os
+import zlib
+import hashlib
+import threading
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Level 1 keeps a cache miss cheap next to the parse it follows, and still
+# shrinks generated HTML about 3-4x.
+COMPRESSION_LEVEL = 1
+
+# Every module whose code affects the HTML produced for a given Markdown
+# source. Their contents form the parser version, so editing the parser
+# invalidates the cache without anyone having to remember to bump a number.
+PARSER_MODULES = (
+    "block_markdown.py", "inline_markdown.py", "textnode.py", "htmlnode.py", "images.py", "search.py",
+)
+
+_parser_version = None
+
+
+def parser_version():
+    global _parser_version
+    if _parser_version is None:
+        digest = hashlib.blake2b(digest_size=8)
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in PARSER_MODULES:
+            with open(os.path.join(directory, name), "rb") as f:
+                digest.update(f.read())
+        _parser_version = digest.hexdigest()
+    return _parser_version
+
+
+class ParseCache:
+    # Content-addressed store of rendered page bodies. Entries are written
+    # atomically and never modified, so several builds (or CI jobs sharing
+    # the directory) can use it at the same time.
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, markdown, variant=""):
+        # `variant` separates renderings of the same source, e.g. minified.
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(parser_version().encode("ascii"))
+        digest.update(variant.encode("utf-8") + b"\0")
+        digest.update(markdown.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, markdown, variant=""):
+        path = self.path_for(self.key(markdown, variant))
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            html = zlib.decompress(data).decode("utf-8")
+        except (OSError, zlib.error, UnicodeDecodeError):
+            return None
+        try:
+            # The mtime doubles as the last-used time for LRU eviction.
+            os.utime(path)
+        except OSError:
+            pass
+        return html
+
+    def put(self, markdown, html, variant=""):
+        path = self.path_for(self.key(markdown, variant))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(html.encode("utf-8"), COMPRESSION_LEVEL))
+        os.replace(tmp_path, path)
+
+    def render(self, markdown, to_html, variant=""):
+        html = self.get(markdown, variant)
+        if html is None:
+            html = to_html(markdown)
+            self.put(markdown, html, variant)
+        return html
+
+    def trim(self):
+        entries = []
+        total = 0
+        for directory, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        freed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            removed += 1
+            freed += size
+        return removed, freed
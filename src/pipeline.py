@@ -0,0 +1,132 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from gencontent import (
+    BuildCancelled, install_worker_images, page_outputs, read_source, render_source_variants, stream_page,
+    worker_images, write_output,
+)
+from profiling import PageTimer
+
+
+class IOPipeline:
+    # Overlaps page I/O with rendering: up to `read_ahead` sources are read
+    # (on an I/O thread pool) and rendered (on a CPU executor) ahead of the
+    # page being reported, and finished pages are handed to `writers` tasks
+    # through a queue. A page takes one of `write_behind` write slots before
+    # giving up its read slot and frees it only once written, so at most
+    # read_ahead + write_behind pages are held in memory however far the
+    # writers fall behind. On slow storage the build then takes about
+    # max(I/O, CPU) instead of their sum.
+    def __init__(self, read_ahead=8, write_behind=8, writers=4):
+        self.read_ahead = read_ahead
+        self.write_behind = write_behind
+        self.writers = writers
+
+    def run(
+        self, pages, template_path, basepath, jobs=1, cancel=None, profile=False, parse_cache=None, minify=False,
+        images=None, stream=None, mirrors=(), search=False,
+    ):
+        return asyncio.run(
+            self._run(
+                pages, template_path, basepath, jobs, cancel, profile, parse_cache, minify, images, stream, mirrors,
+                search,
+            )
+        )
+
+    async def _run(
+        self, pages, template_path, basepath, jobs, cancel, profile, parse_cache, minify, images, stream, mirrors,
+        search,
+    ):
+        loop = asyncio.get_running_loop()
+        io_pool = ThreadPoolExecutor(max_workers=self.read_ahead + self.writers)
+        # A single render thread is enough for jobs=1: the I/O threads spend
+        # their time in system calls with the GIL released. Render processes
+        # get the image index once, when they start, rather than per page.
+        if jobs > 1:
+            cpu_pool = ProcessPoolExecutor(max_workers=jobs, initializer=install_worker_images, initargs=(images,))
+            task_images = None
+        else:
+            cpu_pool = ThreadPoolExecutor(max_workers=1)
+            task_images = images
+        reading = asyncio.Semaphore(self.read_ahead)
+        writing = asyncio.Semaphore(self.write_behind)
+        queue = asyncio.Queue()
+
+        async def build_one(from_path, dest_path):
+            outputs = page_outputs(dest_path, basepath, mirrors)
+            async with reading:
+                timer = PageTimer() if profile else None
+                if stream is not None and stream.applies(from_path):
+                    # Streamed pages do their own I/O, a block at a time.
+                    timer, entry = await loop.run_in_executor(
+                        cpu_pool, _stream, from_path, template_path, outputs, minify, task_images, stream.use_mmap,
+                        timer, search,
+                    )
+                    return (timer.as_dict() if timer is not None else None), entry
+                markdown = await loop.run_in_executor(io_pool, read_source, from_path, timer)
+                (rendered, entry), timer = await loop.run_in_executor(
+                    cpu_pool, _render, markdown, template_path, [basepath for basepath, _ in outputs],
+                    parse_cache, timer, minify, task_images, search,
+                )
+                await writing.acquire()
+            written = loop.create_future()
+            queue.put_nowait((zip([path for _, path in outputs], rendered), timer, written))
+            timer = await written
+            return (timer.as_dict() if timer is not None else None), entry
+
+        async def write_behind():
+            while True:
+                writes, timer, written = await queue.get()
+                try:
+                    for dest_path, page_bytes in writes:
+                        await loop.run_in_executor(io_pool, write_output, dest_path, page_bytes, timer)
+                except Exception as e:
+                    if not written.done():
+                        written.set_exception(e)
+                else:
+                    if not written.done():
+                        written.set_result(timer)
+                finally:
+                    writing.release()
+
+        writers = [asyncio.create_task(write_behind()) for _ in range(self.writers)]
+        tasks = [asyncio.create_task(build_one(from_path, dest_path)) for from_path, dest_path in pages]
+        results = []
+        try:
+            for (from_path, dest_path), task in zip(pages, tasks):
+                if cancel is not None and cancel.is_set():
+                    raise BuildCancelled()
+                print(f'Generating page from {from_path} to {dest_path} using {template_path}')
+                try:
+                    timings, entry = await task
+                except Exception as e:
+                    print(f"Error generating {from_path}: {e}")
+                    results.append((e, None, None))
+                else:
+                    results.append((None, timings, entry))
+        finally:
+            for task in tasks + writers:
+                task.cancel()
+            await asyncio.gather(*tasks, *writers, return_exceptions=True)
+            cpu_pool.shutdown(cancel_futures=True)
+            io_pool.shutdown(cancel_futures=True)
+        return results
+
+
+def _stream(from_path, template_path, outputs, minify, images, use_mmap, timer, search=False):
+    images = worker_images(images)
+    entry = None
+    for i, (basepath, dest_path) in enumerate(outputs):
+        page_entry = stream_page(
+            from_path, template_path, dest_path, basepath, minify, images, use_mmap, timer, search and i == 0
+        )
+        if i == 0:
+            entry = page_entry
+    return timer, entry
+
+
+def _render(markdown, template_path, basepaths, parse_cache, timer, minify, images, search=False):
+    # Runs in the CPU executor; the timer is returned because a process pool
+    # works on a pickled copy of it.
+    images = worker_images(images)
+    rendered = render_source_variants(markdown, template_path, basepaths, parse_cache, timer, minify, images, search)
+    return rendered, timer
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import importlib
+from contextlib import contextmanager, nullcontext
+
+_NULL_CONTEXT = nullcontext()
+
+
+class PageTimer:
+    def __init__(self):
+        self.stages = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    @contextmanager
+    def stage(self, name):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def add(self, name, wall, cpu):
+        totals = self.stages.setdefault(name, [0.0, 0.0])
+        totals[0] += wall
+        totals[1] += cpu
+
+    def timed(self, name, function):
+        def wrapper(*args):
+            with self.stage(name):
+                return function(*args)
+        return wrapper
+
+    def as_dict(self):
+        return {"stages": self.stages, "bytes_read": self.bytes_read, "bytes_written": self.bytes_written}
+
+
+class NullProfiler:
+    enabled = False
+
+    def stage(self, name):
+        return _NULL_CONTEXT
+
+    def record_page(self, page, timings):
+        pass
+
+    def add_bytes(self, read, written):
+        pass
+
+    def count(self, name, amount):
+        pass
+
+
+class BuildProfiler:
+    enabled = True
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.started = time.perf_counter()
+        self.build_stages = PageTimer()
+        self.pages = {}
+        self.counters = {}
+
+    def stage(self, name):
+        return _HookedStage(self, name)
+
+    def add_bytes(self, read, written):
+        self.build_stages.bytes_read += read
+        self.build_stages.bytes_written += written
+
+    def count(self, name, amount):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_page(self, page, timings):
+        self.pages[page] = timings
+        for name, (wall, cpu) in timings["stages"].items():
+            self._emit(name, page, wall, cpu)
+
+    def _emit(self, stage, page, wall, cpu):
+        for hook in self.hooks:
+            hook(stage, page, wall, cpu)
+
+    def report(self, slowest=10):
+        totals = {}
+        bytes_read = self.build_stages.bytes_read
+        bytes_written = self.build_stages.bytes_written
+        for timings in self.pages.values():
+            bytes_read += timings["bytes_read"]
+            bytes_written += timings["bytes_written"]
+            for name, (wall, cpu) in timings["stages"].items():
+                stage_totals = totals.setdefault(name, [0.0, 0.0])
+                stage_totals[0] += wall
+                stage_totals[1] += cpu
+
+        def page_wall(item):
+            return sum(wall for wall, _ in item[1]["stages"].values())
+
+        ranked = sorted(self.pages.items(), key=page_wall, reverse=True)[:slowest]
+        return {
+            "wall": time.perf_counter() - self.started,
+            "build_stages": _stage_table(self.build_stages.stages),
+            "page_stages": _stage_table(totals),
+            "pages": len(self.pages),
+            "bytes_read": bytes_read,
+            "bytes_written": bytes_written,
+            "counters": self.counters,
+            "slowest_pages": [
+                {"page": page, "wall": page_wall((page, timings)), "stages": _stage_table(timings["stages"])}
+                for page, timings in ranked
+            ],
+        }
+
+    def write_report(self, path, slowest=10):
+        directory = os.path.dirname(path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        report = self.report(slowest)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+class _HookedStage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        self.profiler.build_stages.add(self.name, wall, cpu)
+        self.profiler._emit(self.name, None, wall, cpu)
+        return False
+
+
+def _stage_table(stages):
+    return {name: {"wall": wall, "cpu": cpu} for name, (wall, cpu) in stages.items()}
+
+
+def load_hook(spec):
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,186 @@
+import os
+import re
+import json
+from collections import Counter
+from htmlnode import LeafNode
+
+SEARCH_INDEX_VERSION = 1
+SEARCH_DIR = "search"
+PREFIX_LENGTH = 2
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 32
+
+_TERM_RE = re.compile(r"\w+")
+_SHARD_NAME_RE = re.compile(r"[a-z0-9]+")
+
+# Output layout, under <dest>/search/:
+#   index.json   {"version", "prefix_length", "pages": [[url, title] | null, ...], "shards": [...]}
+#   <shard>.json {term: [[id deltas...], [term counts...]], ...}
+# A term lives in the shard named by its first PREFIX_LENGTH characters,
+# or "_" when those aren't [a-z0-9], so a client looks a query term up by
+# fetching just that one shard. Page ids index into "pages".
+
+
+def tokenize(text):
+    return [
+        term for term in _TERM_RE.findall(text.lower())
+        if MIN_TERM_LENGTH <= len(term) <= MAX_TERM_LENGTH
+    ]
+
+
+def page_terms(root):
+    # Term counts over the text of a page's tree, including image alt text.
+    counts = Counter()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, LeafNode):
+            if node.value:
+                counts.update(tokenize(node.value))
+            if node.props and "alt" in node.props:
+                counts.update(tokenize(node.props["alt"]))
+        elif node.children:
+            stack.extend(node.children)
+    return dict(counts)
+
+
+def shard_for(term):
+    prefix = term[:PREFIX_LENGTH]
+    return prefix if _SHARD_NAME_RE.fullmatch(prefix) else "_"
+
+
+def encode_postings(postings):
+    # (page id, count) pairs -> [id deltas, counts], in id order.
+    postings = sorted(postings)
+    deltas = []
+    previous = 0
+    for page_id, _ in postings:
+        deltas.append(page_id - previous)
+        previous = page_id
+    return [deltas, [count for _, count in postings]]
+
+
+def decode_postings(encoded):
+    deltas, counts = encoded
+    postings = []
+    page_id = 0
+    for delta, count in zip(deltas, counts):
+        page_id += delta
+        postings.append((page_id, count))
+    return postings
+
+
+class SearchIndex:
+    # Per-page term counts, kept between builds so that only changed pages
+    # are re-tokenized and only the shards holding their old or new terms
+    # are rewritten. Page ids are stable; ids of removed pages are reused.
+    def __init__(self, path, pages=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        used = set(entry["id"] for entry in self.pages.values())
+        self._next_id = max(used) + 1 if used else 0
+        self._free = sorted(set(range(self._next_id)) - used, reverse=True)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != SEARCH_INDEX_VERSION:
+            return cls(path)
+        return cls(path, data.get("pages", {}))
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": SEARCH_INDEX_VERSION, "pages": self.pages}, f, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def update(self, source, url, title, terms):
+        # Returns the shards whose contents may have changed.
+        entry = self.pages.get(source)
+        if entry is None:
+            page_id = self._free.pop() if self._free else self._take_next_id()
+            touched = set()
+        else:
+            page_id = entry["id"]
+            touched = set(shard_for(term) for term in entry["terms"])
+        self.pages[source] = {"id": page_id, "url": url, "title": title, "terms": terms}
+        touched.update(shard_for(term) for term in terms)
+        return touched
+
+    def forget(self, source):
+        entry = self.pages.pop(source, None)
+        if entry is None:
+            return set()
+        self._free.append(entry["id"])
+        return set(shard_for(term) for term in entry["terms"])
+
+    def _take_next_id(self):
+        page_id = self._next_id
+        self._next_id += 1
+        return page_id
+
+    def write(self, output_dir, shards=None):
+        # Writes index.json and the given shards (all of them when None).
+        # Returns the number of shard files written or removed.
+        search_dir = os.path.join(output_dir, SEARCH_DIR)
+        os.makedirs(search_dir, exist_ok=True)
+        present = set()
+        postings = {}
+        table = [None] * self._next_id
+        for entry in self.pages.values():
+            page_id = entry["id"]
+            table[page_id] = [entry["url"], entry["title"]]
+            for term, count in entry["terms"].items():
+                shard = shard_for(term)
+                present.add(shard)
+                if shards is None or shard in shards:
+                    postings.setdefault(shard, {}).setdefault(term, []).append((page_id, count))
+
+        written = 0
+        for shard in sorted(present if shards is None else shards):
+            path = os.path.join(search_dir, f"{shard}.json")
+            if shard in postings:
+                data = {term: encode_postings(pairs) for term, pairs in postings[shard].items()}
+                written += _write_json(path, data)
+            elif os.path.exists(path):
+                os.remove(path)
+                written += 1
+        if shards is None:
+            for name in os.listdir(search_dir):
+                shard, extension = os.path.splitext(name)
+                if extension == ".json" and shard != "index" and shard not in present:
+                    os.remove(os.path.join(search_dir, name))
+                    written += 1
+
+        index = {
+            "version": SEARCH_INDEX_VERSION,
+            "prefix_length": PREFIX_LENGTH,
+            "pages": table,
+            "shards": sorted(present),
+        }
+        _write_json(os.path.join(search_dir, "index.json"), index)
+        return written
+
+
+def _write_json(path, data):
+    # Skips files whose bytes wouldn't change, and replaces rather than
+    # overwrites the rest (the old file may be hardlinked to the live site).
+    encoded = json.dumps(data, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == encoded:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encoded)
+    os.replace(tmp_path, path)
+    return True
@@ -0,0 +1,276 @@
+import os
+import stat
+import datetime
+import threading
+import email.utils
+from functools import partial
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from compress import COMPRESSIBLE_EXTENSIONS
+
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = (
+    f'<script>new EventSource("{LIVERELOAD_PATH}").onmessage = function () {{ location.reload(); }};</script>'
+)
+# Preferred first; variants are written next to the file by --compress.
+PRECOMPRESSED_VARIANTS = ((".br", "br"), (".gz", "gzip"))
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+# Larger files aren't cached and are sent with sendfile.
+DEFAULT_CACHE_FILE_SIZE = 256 * 1024
+
+
+class ReloadNotifier:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.generation = 0
+
+    def notify(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def wait(self, generation, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation
+
+
+class FileCache:
+    # Bodies of small files, evicting the least recently used past
+    # `max_bytes`. Entries are checked against the file's current stat, so
+    # a rebuilt file is never served stale.
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, max_file_size=DEFAULT_CACHE_FILE_SIZE):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, path, stat):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == _stat_key(stat):
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, path, stat, data):
+        if len(data) > self.max_file_size:
+            return
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self.entries[path] = (_stat_key(stat), data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def _stat_key(stat):
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def make_etag(stat, suffix=""):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{suffix}"'
+
+
+def accepted_encodings(header):
+    # Content codings the client accepts, from an Accept-Encoding header;
+    # those with q=0 are refused.
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests; every response then
+    # needs a Content-Length, which SimpleHTTPRequestHandler's own
+    # redirects, listings and errors already send.
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes, which Nagle's algorithm
+    # would otherwise hold back for the client's delayed ACK.
+    disable_nagle_algorithm = True
+    # Closes idle keep-alive connections so they don't pin a thread each.
+    timeout = 60
+    notifier = None
+    cache = None
+
+    def do_GET(self):
+        if self.notifier is not None and self.path == LIVERELOAD_PATH:
+            self.send_events()
+            return
+        super().do_GET()
+
+    def send_head(self):
+        # Sends regular files itself and returns None; directory redirects,
+        # listings and errors are left to SimpleHTTPRequestHandler.
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not self.path.split("?", 1)[0].endswith("/"):
+                return super().send_head()
+            path = os.path.join(path, "index.html")
+        if path.endswith("/"):
+            return super().send_head()
+        try:
+            source = os.stat(path)
+        except OSError:
+            return super().send_head()
+        if not stat.S_ISREG(source.st_mode):
+            return super().send_head()
+
+        live = self.notifier is not None and path.endswith(".html")
+        vary = not live and path.endswith(COMPRESSIBLE_EXTENSIONS)
+        encoding, variant = (None, path) if not vary else self.choose_variant(path, source)
+        try:
+            f = open(variant, "rb")
+        except OSError:
+            return super().send_head()
+        with f:
+            fs = os.fstat(f.fileno())
+            etag = make_etag(fs, "-live" if live else (f"-{encoding}" if encoding else ""))
+            headers = [
+                ("ETag", etag),
+                ("Last-Modified", self.date_time_string(fs.st_mtime)),
+                # Revalidate every time: a preview must show the latest build,
+                # and an unchanged file costs only a 304.
+                ("Cache-Control", "no-cache"),
+            ]
+            if vary:
+                headers.append(("Vary", "Accept-Encoding"))
+            if self.not_modified(etag, fs.st_mtime):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                return None
+
+            body = None
+            if live or (self.cache is not None and fs.st_size <= self.cache.max_file_size):
+                body = self.cache.get(variant, fs) if self.cache is not None else None
+                if body is None:
+                    body = f.read()
+                    if self.cache is not None:
+                        self.cache.put(variant, fs, body)
+            if live:
+                marker = body.rfind(b"</body>")
+                script = LIVERELOAD_SCRIPT.encode()
+                body = body[:marker] + script + body[marker:] if marker != -1 else body + script
+
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/html; charset=utf-8" if live else self.guess_type(path))
+            self.send_header("Content-Length", str(len(body) if body is not None else fs.st_size))
+            if encoding is not None:
+                self.send_header("Content-Encoding", encoding)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command == "HEAD":
+                return None
+            if body is not None:
+                self.wfile.write(body)
+            else:
+                # Large files go from the page cache to the socket in the
+                # kernel (socket.sendfile falls back to send() elsewhere).
+                self.connection.sendfile(f, 0, fs.st_size)
+        return None
+
+    def choose_variant(self, path, source):
+        # The precompressed variant written by --compress that the client
+        # accepts, if it isn't older than the file itself.
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding"))
+        for extension, encoding in PRECOMPRESSED_VARIANTS:
+            if encoding not in accepted:
+                continue
+            try:
+                variant = os.stat(path + extension)
+            except OSError:
+                continue
+            if stat.S_ISREG(variant.st_mode) and variant.st_mtime_ns >= source.st_mtime_ns:
+                return encoding, path + extension
+        return None, path
+
+    def not_modified(self, etag, mtime):
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, IndexError, OverflowError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        return int(mtime) <= since.timestamp()
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        generation = self.notifier.generation
+        try:
+            while True:
+                current = self.notifier.wait(generation, timeout=15)
+                if current == generation:
+                    self.wfile.write(b": ping\n\n")
+                else:
+                    generation = current
+                    self.wfile.write(b"data: reload\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        # The stream has no length, so the connection can't be reused.
+        self.close_connection = True
+
+
+class PreviewServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for the connection bursts of a load test.
+    request_queue_size = 128
+
+
+def start_preview_server(directory, port, notifier=None, cache=None):
+    server = make_server(directory, port, notifier, cache)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def make_server(directory, port, notifier=None, cache=None):
+    cache = cache if cache is not None else FileCache()
+    handler = type("BoundPreviewHandler", (PreviewHandler,), {"notifier": notifier, "cache": cache})
+    return PreviewServer(("", port), partial(handler, directory=directory))
+
+
+def serve_site(directory, port):
+    server = make_server(directory, port)
+    print(f"Serving {directory} on http://localhost:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
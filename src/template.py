@@ -0,0 +1,171 @@
+import io
+import os
+import re
+from htmlnode import URL_ATTRIBUTES, basepath_needs_quotes, collapse_whitespace, minify_attribute
+
+PLACEHOLDERS = ("Title", "Content")
+BASEPATH_SLOT = "basepath"
+
+_PLACEHOLDER_RE = re.compile(r"\{\{(.*?)\}\}")
+_ROOT_URL_RE = re.compile(r'(?<![\w-])(?:href|src)="?(?=/(?!/))')
+_ROOT_RELATIVE_RE = re.compile(r"/(?!/)")
+
+# Comments and raw-text elements are kept verbatim; any other tag is
+# rewritten attribute by attribute.
+_MARKUP_RE = re.compile(r"<!--.*?-->|<(pre|textarea|script|style)\b.*?</\1\s*>|<[^>]*>", re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r"<\s*(/?)\s*([^\s/>]+)(.*?)/?\s*>", re.DOTALL)
+_ATTRIBUTE_RE = re.compile(r"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+
+# Whitespace next to these tags never renders, so it can be dropped rather
+# than collapsed to one space.
+BLOCK_TAGS = frozenset((
+    "!doctype", "html", "head", "body", "title", "meta", "link", "base", "script", "style",
+    "noscript", "article", "main", "section", "header", "footer", "nav", "aside", "div", "p",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "pre", "blockquote", "table",
+    "thead", "tbody", "tfoot", "tr", "td", "th", "form", "hr", "br", "figure", "figcaption",
+    "dl", "dt", "dd",
+))
+
+_cache = {}
+
+
+class TemplateError(Exception):
+    pass
+
+
+class Template:
+    def __init__(self, path, segments, minify=False, quoted_segments=None):
+        self.path = path
+        self.segments = segments
+        self.minify = minify
+        # Used for basepaths that root-relative URLs can't carry unquoted.
+        self.quoted_segments = quoted_segments if quoted_segments is not None else segments
+
+    def render(self, sink, **values):
+        write = sink.write
+        segments = self.segments
+        if self.minify and basepath_needs_quotes(values[BASEPATH_SLOT]):
+            segments = self.quoted_segments
+        for literal, slot in segments:
+            if literal:
+                write(literal)
+            if slot is None:
+                continue
+            value = values[slot]
+            if isinstance(value, str):
+                write(value)
+            else:
+                value.write_html(sink, self.minify, values[BASEPATH_SLOT])
+
+    def render_to_string(self, **values):
+        out = io.StringIO()
+        self.render(out, **values)
+        return out.getvalue()
+
+
+def compile_template(text, path="<template>", minify=False):
+    # Placeholders are checked on the original text so errors point at the
+    # right line; a minified template is then compiled from scratch.
+    segments = _compile_segments(text, path)
+    if not minify:
+        return Template(path, segments)
+    return Template(
+        path, _compile_segments(minify_markup(text), path), minify,
+        _compile_segments(minify_markup(text, quote_urls=True), path),
+    )
+
+
+def _compile_segments(text, path):
+    segments = []
+    found = set()
+    position = 0
+    for match in _PLACEHOLDER_RE.finditer(text):
+        name = match.group(1).strip()
+        if name not in PLACEHOLDERS:
+            line = text.count("\n", 0, match.start()) + 1
+            raise TemplateError(f"{path}:{line}: unknown placeholder {match.group()}")
+        _split_root_urls(text[position:match.start()], segments)
+        segments.append(("", name))
+        found.add(name)
+        position = match.end()
+    _split_root_urls(text[position:], segments)
+
+    missing = [name for name in PLACEHOLDERS if name not in found]
+    if missing:
+        names = ", ".join("{{ " + name + " }}" for name in missing)
+        raise TemplateError(f"{path}: missing placeholder {names}")
+    return segments
+
+
+def _split_root_urls(literal, segments):
+    # Root-relative href/src values get the basepath at render time, so the
+    # literal is cut right after the "=" or opening quote and the leading "/"
+    # dropped.
+    position = 0
+    for match in _ROOT_URL_RE.finditer(literal):
+        segments.append((literal[position:match.end()], BASEPATH_SLOT))
+        position = match.end() + 1
+    segments.append((literal[position:], None))
+
+
+def minify_markup(text, quote_urls=False):
+    out = []
+    position = 0
+    after_block = True
+    for match in _MARKUP_RE.finditer(text):
+        markup = match.group()
+        name = (match.group(1) or _tag_name(markup)).lower()
+        is_block = name in BLOCK_TAGS
+        out.append(_minify_text(text[position:match.start()], after_block, is_block))
+        if match.group(1) is None and not markup.startswith("<!--"):
+            markup = _minify_tag(markup, quote_urls)
+        out.append(markup)
+        after_block = is_block
+        position = match.end()
+    out.append(_minify_text(text[position:], after_block, True))
+    return "".join(out)
+
+
+def _tag_name(markup):
+    match = _TAG_RE.match(markup)
+    return match.group(2) if match is not None else ""
+
+
+def _minify_text(text, after_block, before_block):
+    text = collapse_whitespace(text)
+    if after_block:
+        text = text.lstrip(" ")
+    if before_block:
+        text = text.rstrip(" ")
+    return text
+
+
+def _minify_tag(markup, quote_urls=False):
+    match = _TAG_RE.match(markup)
+    if match is None:
+        return markup
+    closing, name, rest = match.groups()
+    if closing or name.startswith("!"):
+        return f"<{closing}{name}{collapse_whitespace(rest).rstrip()}>"
+    attributes = []
+    for attribute in _ATTRIBUTE_RE.finditer(rest):
+        attribute_name, double, single, bare = attribute.groups()
+        value = next((part for part in (double, single, bare) if part is not None), None)
+        if value is None:
+            attributes.append(f" {attribute_name}")
+        elif quote_urls and attribute_name in URL_ATTRIBUTES and _ROOT_RELATIVE_RE.match(value):
+            attributes.append(f' {attribute_name}="{value}"')
+        else:
+            attributes.append(minify_attribute(attribute_name, value))
+    return f"<{name}{''.join(attributes)}>"
+
+
+def load_template(path, minify=False):
+    mtime = os.stat(path).st_mtime_ns
+    cached = _cache.get((path, minify))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r") as f:
+        template = compile_template(f.read(), path, minify)
+    _cache[(path, minify)] = (mtime, template)
+    return template
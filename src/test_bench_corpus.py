@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+from bench.corpus import SHAPES, generate_corpus, generate_markdown
+from bench.runner import measure_scaling
+from block_markdown import markdown_to_html_node
+from gencontent import extract_title
+
+class TestCorpusGenerator(unittest.TestCase):
+    def test_same_seed_same_markdown(self):
+        self.assertEqual(generate_markdown("small-pages", seed=3), generate_markdown("small-pages", seed=3))
+        self.assertNotEqual(generate_markdown("small-pages", seed=3), generate_markdown("small-pages", seed=4))
+
+    def test_every_shape_renders(self):
+        for shape in SHAPES:
+            markdown = generate_markdown(shape, blocks=30)
+            self.assertTrue(extract_title(markdown))
+            self.assertTrue(markdown_to_html_node(markdown).to_html().startswith("<div>"))
+
+    def test_link_dense_shape_has_links(self):
+        html = markdown_to_html_node(generate_markdown("link-dense", blocks=2)).to_html()
+        self.assertGreaterEqual(html.count("<a href="), 40)
+
+    def test_generate_corpus_writes_pages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = generate_corpus(tmp, "list-heavy", pages=12, blocks=3)
+            self.assertEqual(len(paths), 12)
+            self.assertTrue(all(os.path.isfile(path) for path in paths))
+
+class TestScalingBenchmark(unittest.TestCase):
+    def test_reports_each_size(self):
+        result = measure_scaling("split_nodes_image", sizes=(10, 100), repeat=1)
+        self.assertEqual([point["links"] for point in result["points"]], [10, 100])
+        self.assertIsNotNone(result["exponent"])
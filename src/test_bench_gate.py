@@ -0,0 +1,88 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+from bench import gate
+from bench.corpus import SHAPES
+from bench.runner import BENCHMARKS
+from bench.gate import IMPROVED, REGRESSED, UNCHANGED, History, compare, format_table, median
+
+BASE = [10.0, 10.2, 9.9, 10.1, 10.0, 9.8, 10.3, 10.0, 10.1, 9.9]
+
+class TestCompare(unittest.TestCase):
+    def verdict(self, current, threshold=0.1):
+        return compare({"m": BASE}, {"m": current}, threshold)[0]["verdict"]
+
+    def test_median(self):
+        self.assertEqual(median([3, 1, 2]), 2)
+        self.assertEqual(median([4, 1, 2, 3]), 2.5)
+
+    def test_verdicts(self):
+        self.assertEqual(self.verdict([sample * 1.02 for sample in BASE]), UNCHANGED)
+        self.assertEqual(self.verdict([sample * 1.5 for sample in BASE]), REGRESSED)
+        self.assertEqual(self.verdict([sample * 0.5 for sample in BASE]), IMPROVED)
+
+    def test_noisy_slowdown_is_not_a_regression(self):
+        noisy = [10.0, 30.0, 9.0, 25.0, 10.5, 8.0, 40.0, 9.5, 11.0, 12.0]
+        self.assertEqual(self.verdict(noisy), UNCHANGED)
+
+    def test_per_metric_threshold(self):
+        rows = compare({"m": BASE}, {"m": [sample * 1.2 for sample in BASE]}, 0.1, {"m": 0.3})
+        self.assertEqual(rows[0]["verdict"], UNCHANGED)
+        self.assertIn("+20.0%", format_table(rows))
+
+class TestHistory(unittest.TestCase):
+    def test_baseline_selection(self):
+        history = History("history.json")
+        history.record("aaa111", False, "m1", {})
+        history.record("bbb222", False, "m2", {})
+        history.record("ccc333", False, "m1", {})
+        self.assertEqual(history.baseline("m1", current=("ccc333", False))["commit"], "aaa111")
+        self.assertEqual(history.baseline("m1", current=("ccc333", True))["commit"], "ccc333")
+        self.assertEqual(history.baseline("m1", "aaa")["commit"], "aaa111")
+        self.assertIsNone(history.baseline("m1", "bbb"))
+        self.assertIsNone(history.baseline("m3"))
+
+class TestMain(unittest.TestCase):
+    def run_gate(self, history, commit, samples):
+        out = io.StringIO()
+        with mock.patch.object(gate, "run_gate_benchmarks", return_value=samples), \
+                mock.patch.object(gate, "current_commit", return_value=(commit, False)), \
+                redirect_stdout(out):
+            code = gate.main(["--history", history])
+        return code, out.getvalue()
+
+    def test_exit_code_follows_regressions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, "history.json")
+            code, log = self.run_gate(history, "aaa", {"m": BASE})
+            self.assertEqual(code, 0)
+            self.assertIn("no baseline", log)
+            code, log = self.run_gate(history, "bbb", {"m": [sample * 1.01 for sample in BASE]})
+            self.assertEqual(code, 0)
+            code, log = self.run_gate(history, "ccc", {"m": [sample * 2 for sample in BASE]})
+            self.assertEqual(code, 1)
+            self.assertIn("1 benchmark(s) regressed: m", log)
+            self.assertEqual(len(History.load(history).runs), 3)
+
+class TestGateBenchmarks(unittest.TestCase):
+    def test_gate_benchmarks_exist(self):
+        for name, shape, _ in gate.GATE_BENCHMARKS:
+            self.assertIn(name, BENCHMARKS)
+            self.assertIn(shape, SHAPES)
+
+    def test_build_site_benchmark_runs_every_stage(self):
+        with tempfile.TemporaryDirectory() as tmp, redirect_stdout(io.StringIO()):
+            run, pages = BENCHMARKS["build_site"](tmp, "code-heavy")
+            run()
+            run()
+            docs = os.path.join(tmp, "docs")
+            self.assertTrue(os.path.isfile(os.path.join(docs, "search", "index.json")))
+            self.assertTrue(os.path.isfile(os.path.join(docs, "index.css.gz")))
+            self.assertFalse(os.path.exists(docs + ".staging"))
+        self.assertEqual(pages, SHAPES["code-heavy"][0])
+
+if __name__ == "__main__":
+    unittest.main()
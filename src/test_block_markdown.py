@@ -1,5 +1,7 @@
 import unittest
-from block_markdown import BlockType, block_to_block_type, markdown_to_blocks, markdown_to_html_node, text_to_children  
+from unittest import mock
+import block_markdown
+from block_markdown import BlockType, block_to_block_type, iter_blocks, markdown_to_blocks, markdown_to_html_node, scan_blocks, text_to_children  
 from htmlnode import ParentNode
 from textnode import TextNode, TextType, text_node_to_html_node
 
@@ -158,6 +160,76 @@ the **same** even with inline stuff
         "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
 
+    def test_codeblock_with_blank_lines(self):
+        md = """
+```
+first line
+
+second line
+```
+
+after
+"""
+
+        node = markdown_to_html_node(md)
+        html = node.to_html()
+        self.assertEqual(
+            html,
+        "<div><pre><code>first line\n\nsecond line\n</code></pre><p>after</p></div>",
+        )
+
+    def test_unclosed_fence_splits_on_blank_lines(self):
+        md = "```\nfirst\n\nsecond"
+        self.assertEqual(markdown_to_blocks(md), ["```\nfirst", "second"])
+
+
+class TestScanBlocks(unittest.TestCase):
+    def test_offsets(self):
+        md = "# Title\n\n  - a\n- b  \n\n\n1. x"
+        blocks = scan_blocks(md)
+        self.assertEqual(
+            [(block_type, md[start:end]) for block_type, start, end in blocks],
+            [
+                (BlockType.HEADING, "# Title"),
+                (BlockType.UNORDERED_LIST, "- a\n- b"),
+                (BlockType.ORDERED_LIST, "1. x"),
+            ],
+        )
+
+    def test_matches_markdown_to_blocks(self):
+        md = "para\none\n\n> quote\n> two\n\n```\ncode\n```"
+        self.assertEqual(
+            [md[start:end] for _, start, end in scan_blocks(md)],
+            markdown_to_blocks(md),
+        )
+
+
+    def test_markdown_to_blocks_keeps_fences_without_classifying(self):
+        for md in ("a\n\n```\nx\n\n\ny\n```\n\nb", "```\nx\n```\n\n  b  \n\n\n", "```\nfirst\n\nsecond\n\n```\nthird"):
+            with mock.patch.object(block_markdown, "_classify") as classify:
+                blocks = markdown_to_blocks(md)
+            classify.assert_not_called()
+            self.assertEqual(blocks, [md[start:end] for _, start, end in scan_blocks(md)])
+
+class TestIterBlocks(unittest.TestCase):
+    def check(self, md):
+        self.assertEqual(
+            list(iter_blocks(md.split("\n"))),
+            [(block_type, md[start:end]) for block_type, start, end in scan_blocks(md)],
+        )
+
+    def test_matches_scan_blocks(self):
+        self.check("# Title\n\n  - a\n- b  \n\n\n1. x\n   \n\n> q")
+        self.check("para\n  \nstill para\n\nnext")
+        self.check("")
+
+    def test_fence_across_blank_lines(self):
+        self.check("```\nfirst  \n\n\nsecond\n  ```  \nafter\n\nend")
+
+    def test_unclosed_fence(self):
+        self.check("```\nfirst\n\nsecond\n\n```\nthird")
+        self.check("```\nfirst\n\nsecond")
+
 
 if __name__ == "__main__":
     unittest.main()
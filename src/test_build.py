@@ -0,0 +1,385 @@
+import os
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+import fsutil
+import gencontent
+from unittest import mock
+from build import BuildOptions, build_site
+from gencontent import PageGenerationError
+from manifest import BuildManifest, manifest_path_for
+from profiling import BuildProfiler
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        self.write(self.template, "<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post)")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nHello")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self, **kwargs):
+        options = BuildOptions(
+            content_dir=self.content,
+            static_dir=self.static,
+            template_path=self.template,
+            dest_dir=self.dest,
+            cache_dir=os.path.join(self.root, ".cache"),
+            explain=True,
+            **kwargs,
+        )
+        out = io.StringIO()
+        with redirect_stdout(out):
+            build_site(options)
+        return out.getvalue()
+
+    def test_first_build_generates_everything(self):
+        log = self.build()
+        self.assertIn("Generated 2 of 2 pages", log)
+        self.assertIn("new page", log)
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "blog", "post.html")))
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        log = self.build()
+        self.assertIn("Generated 0 of 2 pages", log)
+
+    def test_source_change_rebuilds_only_that_page(self):
+        self.build()
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nHello again")
+        log = self.build()
+        self.assertIn("Generated 1 of 2 pages", log)
+        self.assertIn("post.md: source changed", log)
+
+    def test_template_change_rebuilds_everything(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        log = self.build()
+        self.assertIn("Generated 2 of 2 pages", log)
+        self.assertIn("template.html changed", log)
+
+    def test_basepath_change_rebuilds(self):
+        self.build()
+        log = self.build(basepath="/site/")
+        self.assertIn("basepath changed from / to /site/", log)
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertIn('href="/site/blog/post"', f.read())
+
+    def test_parse_cache_is_reused_across_basepaths(self):
+        self.build()
+        parse_dir = os.path.join(self.root, ".cache", "parse")
+        entries = [name for _, _, names in os.walk(parse_dir) for name in names]
+        self.assertEqual(len(entries), 2)
+        self.build(basepath="/site/")
+        self.assertEqual(len([name for _, _, names in os.walk(parse_dir) for name in names]), 2)
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertIn('href="/site/blog/post"', f.read())
+
+    def test_compressed_variants(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\n" + "Hello there. " * 200)
+        log = self.build(compress=True)
+        self.assertIn("Compressed files: 1 compressed, 0 unchanged, 1 skipped", log)
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "blog", "post.html.gz")))
+        log = self.build(compress=True)
+        self.assertIn("Compressed files: 0 compressed, 2 unchanged, 0 skipped", log)
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build(compress=True)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+    def test_turning_compression_off_removes_variants(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "# Post\n\n" + "Hello there. " * 200)
+        self.build(compress=True)
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "blog", "post.html.gz")))
+        self.write(post, "# Post\n\n" + "Hello again. " * 200)
+        log = self.build()
+        self.assertIn("Compressed files: removed variants of 2 files", log)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "post.html.gz")))
+        manifest = BuildManifest.load(manifest_path_for(os.path.join(self.root, ".cache"), self.dest))
+        self.assertEqual(manifest.compressed, {})
+        self.assertNotIn("Compressed files", self.build())
+
+    def test_minify_change_rebuilds(self):
+        self.build()
+        log = self.build(minify=True)
+        self.assertIn("Generated 2 of 2 pages", log)
+        self.assertIn("minify turned on", log)
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertEqual(f.read(), '<title>Home</title><main><div><h1>Home</h1><p><a href=/blog/post>post</a></p></div></main>')
+
+    def test_basepath_skips_code_samples(self):
+        self.write(os.path.join(self.content, "index.md"), '# Home\n\n[post](/blog/post) `<a href="/x">`')
+        for kwargs in ({}, {"profiler": BuildProfiler()}, {"parse_cache": False}):
+            self.build(basepath="/site/", force=True, **kwargs)
+            with open(os.path.join(self.dest, "index.html")) as f:
+                self.assertIn('<a href="/site/blog/post">post</a> <code><a href="/x"></code>', f.read())
+
+    def test_image_dimensions_are_added(self):
+        os.makedirs(os.path.join(self.static, "images"))
+        image = os.path.join(self.static, "images", "a.png")
+        with open(image, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n\0\0\0\x0dIHDR\0\0\0\x0a\0\0\0\x14" + b"\0" * 16)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/images/a.png) ![b](/images/b.png)")
+        self.build()
+        with open(os.path.join(self.dest, "index.html")) as f:
+            html = f.read()
+        self.assertIn('<img src="/images/a.png" alt="a" width="10" height="20" fetchpriority="high" decoding="async">', html)
+        self.assertIn('<img src="/images/b.png" alt="b" loading="lazy" decoding="async">', html)
+        with open(image, "r+b") as f:
+            f.seek(16)
+            f.write(b"\0\0\0\x0b\0\0\0\x16\0")
+        log = self.build()
+        self.assertIn("index.md: image dimensions changed", log)
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertIn('width="11" height="22"', f.read())
+
+    def test_image_change_rebuilds_only_pages_embedding_it(self):
+        os.makedirs(os.path.join(self.static, "images"))
+        image = os.path.join(self.static, "images", "a.gif")
+        with open(image, "wb") as f:
+            f.write(b"GIF89a\x0a\0\x14\0")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\n![a](/images/a.gif)")
+        self.build()
+        with open(image, "wb") as f:
+            f.write(b"GIF89a\x0b\0\x16\0\0")
+        log = self.build()
+        self.assertIn("Generated 1 of 2 pages", log)
+        self.assertIn("post.md: image dimensions changed", log)
+
+    def test_new_image_keeps_other_cached_bodies(self):
+        os.makedirs(os.path.join(self.static, "images"))
+        image = os.path.join(self.static, "images", "a.gif")
+        with open(image, "wb") as f:
+            f.write(b"GIF89a\x0a\0\x14\0")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\n![a](/images/a.gif)")
+        self.build()
+        parse_dir = os.path.join(self.root, ".cache", "parse")
+
+        def cached_bodies():
+            return len([name for _, _, names in os.walk(parse_dir) for name in names])
+
+        self.assertEqual(cached_bodies(), 2)
+        with open(os.path.join(self.static, "images", "b.gif"), "wb") as f:
+            f.write(b"GIF89a\x01\0\x01\0")
+        self.build(force=True)
+        self.assertEqual(cached_bodies(), 2)
+        with open(image, "wb") as f:
+            f.write(b"GIF89a\x0b\0\x16\0\0")
+        self.build(force=True)
+        self.assertEqual(cached_bodies(), 3)
+
+    def test_broken_links_are_reported(self):
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\n[home](/) [missing](/blog/missing)")
+        log = self.build()
+        self.assertIn(f"Broken link in {os.path.join(self.content, 'blog', 'post.md')}: /blog/missing", log)
+        self.assertIn("Link check: 1 broken links in 2 pages", log)
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        log = self.build()
+        self.assertIn(f"Broken link in {os.path.join(self.content, 'index.md')}: /blog/post", log)
+
+    def test_search_index_is_updated_incrementally(self):
+        log = self.build(search_index=True, basepath="/site/")
+        self.assertIn("Search index: 2 pages indexed", log)
+        with open(os.path.join(self.dest, "search", "index.json")) as f:
+            self.assertEqual(json.load(f)["pages"], [["/site/blog/post.html", "Post"], ["/site/index.html", "Home"]])
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nGoodbye")
+        log = self.build(search_index=True, basepath="/site/")
+        self.assertIn("Search index: 1 pages indexed, 2 shards written", log)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "search", "he.json")))
+        with open(os.path.join(self.dest, "search", "go.json")) as f:
+            self.assertEqual(json.load(f), {"goodbye": [[0], [1]]})
+
+    def test_search_terms_come_from_the_render(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post) ![a cat](/cat.png)\n\n- **bold**")
+        self.build(search_index=True)
+        expected = self.read_search_index()
+        for kwargs in ({}, {"jobs": 2}, {"pipeline": True}, {"stream_threshold": 0}, {"parse_cache": False}):
+            with mock.patch("build._page_search_entry", side_effect=AssertionError("page re-read")):
+                self.build(force=True, search_index=True, **kwargs)
+            self.assertEqual(self.read_search_index(), expected)
+
+    def read_search_index(self):
+        files = {}
+        search_dir = os.path.join(self.dest, "search")
+        for name in sorted(os.listdir(search_dir)):
+            with open(os.path.join(search_dir, name)) as f:
+                files[name] = f.read()
+        return files
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        log = self.build()
+        self.assertIn("removed 1", log)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.dest, "index.html"))
+        log = self.build()
+        self.assertIn("index.md: output missing", log)
+
+    def test_manifest_records_hashes(self):
+        self.build()
+        manifest = BuildManifest.load(manifest_path_for(os.path.join(self.root, ".cache"), self.dest))
+        entry = manifest.pages[os.path.join(self.content, "index.md")]
+        self.assertEqual(entry["basepath"], "/")
+        self.assertEqual(len(entry["output_hash"]), 32)
+
+    def test_parallel_build_matches_serial(self):
+        for i in range(6):
+            self.write(os.path.join(self.content, f"page{i}.md"), f"# Page {i}\n\n" + "text " * (i * 100))
+        serial_log = self.build(force=True)
+        with open(os.path.join(self.dest, "page5.html")) as f:
+            serial_html = f.read()
+        parallel_log = self.build(force=True, jobs=3)
+        with open(os.path.join(self.dest, "page5.html")) as f:
+            self.assertEqual(f.read(), serial_html)
+        self.assertEqual(serial_log, parallel_log)
+
+    def test_pipelined_build_matches_serial(self):
+        for i in range(6):
+            self.write(os.path.join(self.content, f"page{i}.md"), f"# Page {i}\n\n" + "text " * (i * 100))
+        serial_log = self.build(force=True)
+        with open(os.path.join(self.dest, "page5.html")) as f:
+            serial_html = f.read()
+        for jobs in (1, 2):
+            pipelined_log = self.build(force=True, jobs=jobs, pipeline=True, read_ahead=2, write_behind=1)
+            with open(os.path.join(self.dest, "page5.html")) as f:
+                self.assertEqual(f.read(), serial_html)
+            self.assertEqual(serial_log, pipelined_log)
+
+    def test_streamed_build_matches_whole_page_build(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post) [gone](/gone)\n\n```\n[no](/no)\n```")
+        self.build(force=True, search_index=True)
+        whole_log = self.build(force=True, search_index=True)
+        with open(os.path.join(self.dest, "index.html")) as f:
+            whole_html = f.read()
+        for kwargs in ({"pipeline": True}, {"jobs": 2}, {"stream_mmap": True}):
+            streamed_log = self.build(force=True, search_index=True, stream_threshold=0, **kwargs)
+            with open(os.path.join(self.dest, "index.html")) as f:
+                self.assertEqual(f.read(), whole_html)
+            self.assertEqual(streamed_log, whole_log)
+
+    def test_mirrored_targets_match_separate_builds(self):
+        self.write(os.path.join(self.static, "style.css"), "body {}")
+        preview = os.path.join(self.root, "preview")
+        for kwargs in ({}, {"pipeline": True}, {"jobs": 2}, {"stream_threshold": 0}, {"parse_cache": False}):
+            self.build(basepath="/site/", force=True, **kwargs)
+            with open(os.path.join(self.dest, "index.html")) as f:
+                site_html = f.read()
+            self.build(basepath="/", force=True, **kwargs)
+            with open(os.path.join(self.dest, "index.html")) as f:
+                root_html = f.read()
+            self.assertNotEqual(site_html, root_html)
+
+            log = self.build(basepath="/site/", force=True, mirrors=[("/", preview)], **kwargs)
+            self.assertIn("Generated 2 of 2 pages", log)
+            with open(os.path.join(self.dest, "index.html")) as f:
+                self.assertEqual(f.read(), site_html)
+            with open(os.path.join(preview, "index.html")) as f:
+                self.assertEqual(f.read(), root_html)
+            self.assertTrue(os.path.isfile(os.path.join(preview, "blog", "post.html")))
+            self.assertTrue(os.path.isfile(os.path.join(preview, "style.css")))
+
+        log = self.build(basepath="/site/", mirrors=[("/", preview)])
+        self.assertIn("Generated 0 of 2 pages", log)
+        self.assertIn(f"Static files in {preview}: 0 copied, 1 unchanged", log)
+        os.remove(os.path.join(preview, "blog", "post.html"))
+        log = self.build(basepath="/site/", mirrors=[("/", preview)])
+        self.assertIn("Generated 1 of 2 pages", log)
+        self.assertTrue(os.path.isfile(os.path.join(preview, "blog", "post.html")))
+
+    def test_mirrored_targets_parse_each_page_once(self):
+        preview = os.path.join(self.root, "preview")
+        with mock.patch.object(gencontent, "markdown_to_html_node", wraps=gencontent.markdown_to_html_node) as parse:
+            self.build(parse_cache=False, mirrors=[("/a/", preview), ("/b/", preview + "-b")])
+        self.assertEqual(parse.call_count, 2)
+        with open(os.path.join(preview + "-b", "index.html")) as f:
+            self.assertIn('href="/b/blog/post"', f.read())
+
+    def test_failing_page_does_not_drop_others(self):
+        self.write(os.path.join(self.content, "broken.md"), "no title here")
+        for jobs, pipeline in ((1, False), (2, False), (1, True)):
+            with self.assertRaises(PageGenerationError) as context:
+                self.build(force=True, jobs=jobs, pipeline=pipeline)
+            self.assertEqual([src for src, _ in context.exception.failures], [os.path.join(self.content, "broken.md")])
+            self.assertIn("broken.md: No header in MD.", str(context.exception))
+            self.assertTrue(os.path.isfile(os.path.join(self.dest, "blog", "post.html")))
+
+    def test_undecodable_page_does_not_drop_others(self):
+        with open(os.path.join(self.content, "bad.md"), "wb") as f:
+            f.write(b"# Bad\n\n\xff\xfe")
+        for kwargs in ({}, {"stream_threshold": 0}):
+            with self.assertRaises(PageGenerationError) as context:
+                self.build(force=True, atomic=False, **kwargs)
+            self.assertEqual([src for src, _ in context.exception.failures], [os.path.join(self.content, "bad.md")])
+            self.assertIn("1 page(s) failed", str(context.exception))
+            self.assertTrue(os.path.isfile(os.path.join(self.dest, "blog", "post.html")))
+
+
+class TestAtomicBuild(TestIncrementalBuild):
+    def build(self, **kwargs):
+        kwargs.setdefault("atomic", True)
+        return super().build(**kwargs)
+
+    def test_failing_page_does_not_drop_others(self):
+        self.write(os.path.join(self.content, "broken.md"), "no title here")
+        with self.assertRaises(PageGenerationError):
+            self.build()
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertFalse(os.path.exists(self.dest + ".staging"))
+
+    def test_staging_is_swapped_in_and_removed(self):
+        self.build()
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "index.html")))
+        self.assertFalse(os.path.exists(self.dest + ".staging"))
+
+    def test_unchanged_outputs_keep_their_inode(self):
+        self.build()
+        index = os.path.join(self.dest, "index.html")
+        post = os.path.join(self.dest, "blog", "post.html")
+        index_inode = os.stat(index).st_ino
+        post_inode = os.stat(post).st_ino
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nChanged")
+        self.build()
+        self.assertEqual(os.stat(index).st_ino, index_inode)
+        self.assertNotEqual(os.stat(post).st_ino, post_inode)
+        with open(post) as f:
+            self.assertIn("Changed", f.read())
+
+    def test_failed_build_leaves_live_site_untouched(self):
+        self.build()
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nChanged")
+        self.write(os.path.join(self.content, "broken.md"), "no title here")
+        with self.assertRaises(PageGenerationError):
+            self.build()
+        with open(os.path.join(self.dest, "blog", "post.html")) as f:
+            self.assertNotIn("Changed", f.read())
+        self.assertFalse(os.path.exists(self.dest + ".staging"))
+        os.remove(os.path.join(self.content, "broken.md"))
+        self.assertIn("post.md: source changed", self.build())
+
+    def test_swap_without_rename_exchange(self):
+        self.build()
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nChanged")
+        with mock.patch.object(fsutil, "exchange_paths", return_value=False):
+            self.build()
+        with open(os.path.join(self.dest, "blog", "post.html")) as f:
+            self.assertIn("Changed", f.read())
+        self.assertFalse(os.path.exists(self.dest + ".old"))
@@ -0,0 +1,68 @@
+import os
+import gzip
+import tempfile
+import unittest
+from compress import compress_outputs
+
+class TestCompressOutputs(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, "blog"))
+        self.page = os.path.join(self.root, "blog", "index.html")
+        self.write(self.page, b"<p>Hello, world</p>\n" * 200)
+        self.write(os.path.join(self.root, "small.css"), b"body {}")
+        self.write(os.path.join(self.root, "random.js"), os.urandom(4096))
+        self.write(os.path.join(self.root, "image.png"), b"\0" * 4096)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, data):
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def test_writes_variants_that_shrink(self):
+        result = compress_outputs(self.root)
+        self.assertEqual(result.compressed, [os.path.join("blog", "index.html")])
+        self.assertEqual(sorted(result.skipped), ["random.js", "small.css"])
+        with open(self.page + ".gz", "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), b"<p>Hello, world</p>\n" * 200)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "random.js.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "small.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "image.png.gz")))
+        self.assertEqual(result.bytes_saved()[".gz"], 4000 - os.path.getsize(self.page + ".gz"))
+
+    def test_unchanged_files_are_not_recompressed(self):
+        first = compress_outputs(self.root)
+        os.utime(self.page + ".gz", ns=(0, 0))
+        result = compress_outputs(self.root, first.files)
+        self.assertEqual(result.compressed, [])
+        self.assertEqual(result.unchanged, 3)
+        self.assertEqual(os.stat(self.page + ".gz").st_mtime_ns, 0)
+
+    def test_rewrite_with_same_bytes_is_unchanged(self):
+        first = compress_outputs(self.root)
+        self.write(self.page, b"<p>Hello, world</p>\n" * 200)
+        os.utime(self.page, ns=(1, 1))
+        result = compress_outputs(self.root, first.files)
+        self.assertEqual(result.compressed, [])
+        self.assertEqual(result.files[os.path.join("blog", "index.html")]["mtime_ns"], 1)
+
+    def test_changed_and_removed_files(self):
+        first = compress_outputs(self.root)
+        self.write(self.page, b"<p>tiny</p>")
+        result = compress_outputs(self.root, first.files)
+        self.assertEqual(result.skipped[0], os.path.join("blog", "index.html"))
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+
+        self.write(self.page, b"<p>Hello again</p>\n" * 200)
+        second = compress_outputs(self.root, result.files)
+        os.remove(self.page)
+        third = compress_outputs(self.root, second.files)
+        self.assertEqual(third.removed, [os.path.join("blog", "index.html")])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "blog")))
+
+
+if __name__ == "__main__":
+    unittest.main()
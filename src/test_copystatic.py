@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from copystatic import sync_static
+
+class TestSyncStatic(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.source, "images"))
+        self.write(os.path.join(self.source, "index.css"), "body {}")
+        self.write(os.path.join(self.source, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_first_sync_copies_everything(self):
+        result = sync_static(self.source, self.dest)
+        self.assertEqual(result.files, ["index.css", os.path.join("images", "a.png")])
+        self.assertEqual(len(result.copied), 2)
+        self.assertEqual(self.read(os.path.join(self.dest, "images", "a.png")), "png")
+
+    def test_unchanged_files_are_skipped(self):
+        sync_static(self.source, self.dest)
+        result = sync_static(self.source, self.dest)
+        self.assertEqual(result.copied, [])
+        self.assertEqual(result.unchanged, 2)
+
+    def test_modified_file_is_copied(self):
+        sync_static(self.source, self.dest)
+        self.write(os.path.join(self.source, "index.css"), "body { color: red }")
+        result = sync_static(self.source, self.dest)
+        self.assertEqual(result.copied, ["index.css"])
+        self.assertEqual(self.read(os.path.join(self.dest, "index.css")), "body { color: red }")
+
+    def test_checksum_skips_touched_but_identical_files(self):
+        sync_static(self.source, self.dest)
+        os.utime(os.path.join(self.source, "index.css"), (0, 0))
+        self.assertEqual(sync_static(self.source, self.dest, checksum=True).copied, [])
+        self.assertEqual(sync_static(self.source, self.dest).copied, ["index.css"])
+
+    def test_removed_source_is_deleted(self):
+        first = sync_static(self.source, self.dest)
+        os.remove(os.path.join(self.source, "images", "a.png"))
+        result = sync_static(self.source, self.dest, first.files)
+        self.assertEqual(result.removed, [os.path.join("images", "a.png")])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+
+    def test_files_not_previously_synced_are_kept(self):
+        os.makedirs(self.dest)
+        self.write(os.path.join(self.dest, "index.html"), "page")
+        sync_static(self.source, self.dest, ["old.css"])
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_link_mode_hardlinks(self):
+        sync_static(self.source, self.dest, link=True)
+        source_stat = os.stat(os.path.join(self.source, "index.css"))
+        dest_stat = os.stat(os.path.join(self.dest, "index.css"))
+        self.assertEqual(source_stat.st_ino, dest_stat.st_ino)
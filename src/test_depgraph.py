@@ -0,0 +1,38 @@
+import unittest
+from depgraph import DependencyGraph, extract_references, resolve_url
+
+class TestExtractReferences(unittest.TestCase):
+    def test_links_and_images(self):
+        markdown = (
+            "# Title\n\n[home](/) and [post](/blog/post#top) ![cat](/images/cat.png)\n\n"
+            "[again](/blog/post) [out](https://example.com) [anchor](#top)"
+        )
+        self.assertEqual(
+            extract_references(markdown, "/index.html"),
+            {"links": ["/", "/blog/post"], "images": ["/images/cat.png"]},
+        )
+
+    def test_code_is_skipped(self):
+        markdown = "# Title\n\n```\n[a](/a)\n```\n\n`[b](/b)` [c](/c)"
+        self.assertEqual(extract_references(markdown, "/index.html"), {"links": ["/c"], "images": []})
+
+    def test_relative_urls(self):
+        self.assertEqual(resolve_url("../majesty", "/blog/tom/index.html"), "/blog/majesty")
+        self.assertEqual(resolve_url("img/a.png?v=2", "/blog/post.html"), "/blog/img/a.png")
+        self.assertEqual(resolve_url("/blog/", "/index.html"), "/blog/")
+        self.assertEqual(resolve_url("/a%20b", "/index.html"), "/a b")
+        self.assertIsNone(resolve_url("mailto:me@example.com", "/index.html"))
+        self.assertIsNone(resolve_url("//cdn.example.com/x.js", "/index.html"))
+
+class TestDependencyGraph(unittest.TestCase):
+    def test_broken_links(self):
+        graph = DependencyGraph()
+        graph.update("index.md", {"links": ["/", "/blog/post", "/blog/", "/gone"], "images": ["/cat.png"]})
+        graph.update("blog/index.md", {"links": ["/index.css"], "images": ["/dog.png"]})
+        outputs = {"/index.html", "/blog/post.html", "/blog/index.html", "/index.css", "/cat.png"}
+        self.assertEqual(graph.broken_links(outputs), [("blog/index.md", "/dog.png"), ("index.md", "/gone")])
+        graph.forget("blog/index.md")
+        self.assertEqual(graph.broken_links(outputs), [("index.md", "/gone")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,20 @@
+import io
+import os
+import tempfile
 import unittest
-from gencontent import extract_title
+import tracemalloc
+from contextlib import redirect_stdout
+from gencontent import extract_title, generate_pages, render_page, render_source_variants, stream_page
+from images import ImageIndex
+from parsecache import ParseCache
+from pipeline import IOPipeline
+
+class CountingImageIndex(ImageIndex):
+    pickled = 0
+
+    def __getstate__(self):
+        CountingImageIndex.pickled += 1
+        return self.__dict__
 
 class TestExtractTitle(unittest.TestCase):
     def test_extract_title_simple(self):
@@ -106,3 +121,124 @@ class TestExtractTitle(unittest.TestCase):
     # Real Title"""
         title = extract_title(md)
         self.assertEqual(title, "Real Title")
+
+class TestMinifiedBasepath(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write('<link href="/index.css"><title>{{ Title }}</title>{{ Content }}')
+        self.source = os.path.join(self.tmp.name, "page.md")
+        with open(self.source, "w") as f:
+            f.write("# Home\n\nSee [tom](/blog/tom).")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def render(self, basepath, parse_cache=None):
+        dest = os.path.join(self.tmp.name, "page.html")
+        render_page(self.source, self.template, dest, basepath, parse_cache=parse_cache, minify=True)
+        with open(dest) as f:
+            return f.read()
+
+    def test_cached_body_matches_uncached(self):
+        cache = ParseCache(os.path.join(self.tmp.name, "parse"))
+        for basepath in ("/my site/", "/site/", "/my site/"):
+            uncached = self.render(basepath)
+            self.assertEqual(self.render(basepath, cache), uncached)
+            self.assertEqual(self.render(basepath, cache), uncached)
+        self.assertEqual(
+            self.render("/my site/"),
+            '<link href="/my site/index.css"><title>Home</title>'
+            '<div><h1>Home</h1><p>See <a href="/my site/blog/tom">tom</a>.</p></div>',
+        )
+
+    def test_variants_quote_per_basepath(self):
+        with open(self.source) as f:
+            markdown = f.read()
+        cache = ParseCache(os.path.join(self.tmp.name, "parse"))
+        basepaths = ["/site/", "/my site/"]
+        rendered, _ = render_source_variants(markdown, self.template, basepaths, cache, minify=True)
+        self.assertEqual([page.decode() for page in rendered], [self.render(basepath) for basepath in basepaths])
+
+class TestWorkerImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        self.pages = []
+        for i in range(12):
+            source = os.path.join(self.tmp.name, f"page{i}.md")
+            with open(source, "w") as f:
+                f.write(f"# Page {i}\n\n![a](/a.png)")
+            self.pages.append((source, os.path.join(self.tmp.name, "out", f"page{i}.html")))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_index_is_sent_once_per_worker(self):
+        for pipeline in (None, IOPipeline()):
+            CountingImageIndex.pickled = 0
+            images = CountingImageIndex("images.json", {"/a.png": [0, 0, 4, 3]})
+            with redirect_stdout(io.StringIO()):
+                failures = generate_pages(self.pages, self.template, "/", jobs=2, pipeline=pipeline, images=images)
+            self.assertEqual(failures, [])
+            self.assertLessEqual(CountingImageIndex.pickled, 2)
+            for _, dest_path in self.pages:
+                with open(dest_path) as f:
+                    self.assertIn('width="4" height="3"', f.read())
+
+class TestStreamPage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.template = self.path("template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>\n<main>\n  {{ Content }}\n</main> <a href=\"/\">home</a>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def write_source(self, markdown):
+        with open(self.path("page.md"), "w") as f:
+            f.write(markdown)
+
+    def read(self, name):
+        with open(self.path(name)) as f:
+            return f.read()
+
+    def test_matches_render_page(self):
+        self.write_source(
+            "Intro ![a](/a.png)\n\n# Title\n\n```\ncode\n\n  kept\n```\n\n- [one](/one)\n- ![b](/b.png)\n\n> quote"
+        )
+        images = ImageIndex("images.json", {"/a.png": [0, 0, 4, 3]})
+        for kwargs in ({}, {"minify": True}, {"images": images}, {"use_mmap": True}):
+            render_kwargs = {key: value for key, value in kwargs.items() if key != "use_mmap"}
+            render_page(self.path("page.md"), self.template, self.path("page.html"), "/site/", **render_kwargs)
+            stream_page(self.path("page.md"), self.template, self.path("streamed.html"), "/site/", **kwargs)
+            self.assertEqual(self.read("streamed.html"), self.read("page.html"))
+
+    def test_missing_title_leaves_no_output(self):
+        self.write_source("no title")
+        with self.assertRaises(Exception):
+            stream_page(self.path("page.md"), self.template, self.path("page.html"), "/")
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["page.md", "template.html"])
+
+    def test_memory_is_bounded_by_block(self):
+        block = "A paragraph with a [link](/somewhere) and some **bold** text.\n" * 20 + "\n"
+        with open(self.path("page.md"), "w") as f:
+            f.write("# Big\n\n")
+            for _ in range(300):
+                f.write(block)
+        size = os.path.getsize(self.path("page.md"))
+        tracemalloc.start()
+        try:
+            stream_page(self.path("page.md"), self.template, self.path("page.html"), "/")
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, size / 2)
+
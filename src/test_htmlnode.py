@@ -1,3 +1,5 @@
+import io
+import pickle
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -194,3 +196,100 @@ class TestParentNode(unittest.TestCase):
             parent_node.to_html(),
             '<div><a href="https://example.com">Click here</a></div>'
         )
+
+class TestStreamingHTML(unittest.TestCase):
+    def build_tree(self):
+        return ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "Hello "), LeafNode("b", "world")]),
+            LeafNode("a", "link", {"href": "/x"}),
+        ])
+
+    def test_write_html_to_list(self):
+        chunks = []
+        self.build_tree().write_html(chunks)
+        self.assertEqual(
+            chunks,
+            ["<div>", "<p>", "Hello ", "<b>world</b>", "</p>", '<a href="/x">link</a>', "</div>"],
+        )
+
+    def test_write_html_to_file_like(self):
+        out = io.StringIO()
+        tree = self.build_tree()
+        tree.write_html(out)
+        self.assertEqual(out.getvalue(), tree.to_html())
+
+    def test_iter_html_matches_to_html(self):
+        tree = self.build_tree()
+        self.assertEqual("".join(tree.iter_html()), tree.to_html())
+
+    def test_iter_html_raises_on_missing_children(self):
+        with self.assertRaises(ValueError):
+            list(ParentNode("div", None).iter_html())
+
+    def test_base_node_write_html_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            HTMLNode("p", "text").write_html([])
+
+class TestCompactNodes(unittest.TestCase):
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("div", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_nodes_reject_unknown_attributes(self):
+        with self.assertRaises(AttributeError):
+            LeafNode("b", "x").extra = 1
+
+    def test_pickle_round_trip(self):
+        tree = ParentNode("p", [LeafNode(None, "a "), LeafNode("a", "b", {"href": "/x"})])
+        self.assertEqual(pickle.loads(pickle.dumps(tree)).to_html(), tree.to_html())
+
+class TestMinifiedHTML(unittest.TestCase):
+    def test_collapses_text_whitespace(self):
+        node = ParentNode("p", [LeafNode(None, "Hello \n  there "), LeafNode("b", "bold\ttext")])
+        self.assertEqual(node.to_html(minify=True), "<p>Hello there <b>bold text</b></p>")
+
+    def test_keeps_pre_and_code_contents(self):
+        node = ParentNode("div", [
+            ParentNode("pre", [LeafNode("code", "a  =\n  1\n")]),
+            ParentNode("p", [LeafNode("code", "x  y")]),
+        ])
+        self.assertEqual(
+            node.to_html(minify=True),
+            "<div><pre><code>a  =\n  1\n</code></pre><p><code>x  y</code></p></div>",
+        )
+
+    def test_drops_optional_quotes(self):
+        node = LeafNode("img", "", {"src": "/a.png", "alt": "", "width": "30", "title": "two words"})
+        self.assertEqual(node.to_html(minify=True), '<img src=/a.png alt width=30 title="two words"></img>')
+
+    def test_non_breaking_space_is_kept(self):
+        self.assertEqual(LeafNode(None, "a\xa0\xa0b").to_html(minify=True), "a\xa0\xa0b")
+
+    def test_write_html_minified_to_file_like(self):
+        out = io.StringIO()
+        node = ParentNode("p", [LeafNode("a", "x  y", {"href": "https://x.com"})])
+        node.write_html(out, minify=True)
+        self.assertEqual(out.getvalue(), "<p><a href=https://x.com>x y</a></p>")
+
+class TestBasepath(unittest.TestCase):
+    def test_props_to_html_prefixes_root_relative_urls(self):
+        node = LeafNode("a", "x", {"href": "/blog/", "title": "/not-a-url"})
+        self.assertEqual(node.props_to_html("/site/"), ' href="/site/blog/" title="/not-a-url"')
+        self.assertEqual(node.props_to_html(), ' href="/blog/" title="/not-a-url"')
+
+    def test_other_urls_are_untouched(self):
+        node = LeafNode("img", "", {"src": "https://x.com/a.png", "alt": "a"})
+        self.assertEqual(node.to_html(basepath="/site/"), '<img src="https://x.com/a.png" alt="a"></img>')
+
+    def test_text_is_never_rewritten(self):
+        node = ParentNode("pre", [LeafNode("code", 'href="/x"')])
+        self.assertEqual(node.to_html(basepath="/site/"), '<pre><code>href="/x"</code></pre>')
+
+    def test_minified_basepath(self):
+        node = LeafNode("a", "x", {"href": "/blog/"})
+        self.assertEqual(node.to_html(minify=True, basepath="/site/"), "<a href=/site/blog/>x</a>")
+        self.assertEqual(node.to_html(minify=True, basepath="/my site/"), '<a href="/my site/blog/">x</a>')
+
+    def test_protocol_relative_urls_are_untouched(self):
+        node = LeafNode("img", "", {"src": "//cdn.x.com/a.png"})
+        self.assertEqual(node.to_html(basepath="/site/"), '<img src="//cdn.x.com/a.png"></img>')
@@ -0,0 +1,127 @@
+import os
+import json
+import struct
+import tempfile
+import unittest
+from unittest import mock
+from htmlnode import LeafNode, ParentNode
+from images import ImageIndex, annotate_images, read_image_size
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", width, height) + b"\x08\x06\0\0\0" + b"\0" * 64
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\0" * 32
+
+def jpeg(width, height):
+    exif = b"\xff\xe1" + struct.pack(">H", 2 + 4000) + b"\0" * 4000
+    frame = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + exif + frame + b"\xff\xd9"
+
+def webp(chunk, payload):
+    return b"RIFF" + struct.pack("<I", 100) + b"WEBP" + chunk + struct.pack("<I", len(payload)) + payload + b"\0" * 32
+
+class TestReadImageSize(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def size_of(self, data):
+        path = os.path.join(self.tmp.name, "image")
+        with open(path, "wb") as f:
+            f.write(data)
+        return read_image_size(path)
+
+    def test_png(self):
+        self.assertEqual(self.size_of(png(640, 480)), (640, 480))
+
+    def test_gif(self):
+        self.assertEqual(self.size_of(gif(16, 9)), (16, 9))
+
+    def test_jpeg_skips_exif(self):
+        self.assertEqual(self.size_of(jpeg(1920, 1080)), (1920, 1080))
+
+    def test_webp_lossy(self):
+        payload = b"\0\0\0\x9d\x01\x2a" + struct.pack("<HH", 300, 200)
+        self.assertEqual(self.size_of(webp(b"VP8 ", payload)), (300, 200))
+
+    def test_webp_lossless(self):
+        bits = (300 - 1) | (200 - 1) << 14
+        self.assertEqual(self.size_of(webp(b"VP8L", b"\x2f" + struct.pack("<I", bits))), (300, 200))
+
+    def test_webp_extended(self):
+        payload = b"\0" * 4 + (300 - 1).to_bytes(3, "little") + (200 - 1).to_bytes(3, "little")
+        self.assertEqual(self.size_of(webp(b"VP8X", payload)), (300, 200))
+
+    def test_unrecognised(self):
+        self.assertIsNone(self.size_of(b"<svg></svg>"))
+        self.assertIsNone(self.size_of(b"\xff\xd8\xff\xd9"))
+
+class TestImageIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.path = os.path.join(self.tmp.name, ".cache", "images.json")
+        self.write("images/a.png", png(10, 20))
+        self.write("images/b.gif", gif(3, 4))
+        self.write("index.css", b"body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        with open(os.path.join(self.static, name), "wb") as f:
+            f.write(data)
+
+    def test_refresh_indexes_images_by_url(self):
+        index = ImageIndex.load(self.path)
+        self.assertEqual(index.refresh(self.static), {"/images/a.png", "/images/b.gif"})
+        self.assertEqual(index.size_of("/images/a.png"), (10, 20))
+        self.assertIsNone(index.size_of("/index.css"))
+
+    def test_unchanged_images_are_not_reread(self):
+        index = ImageIndex.load(self.path)
+        index.refresh(self.static)
+        index.save()
+        index = ImageIndex.load(self.path)
+        fingerprint = index.fingerprint()
+        with mock.patch("images.read_image_size") as read:
+            self.assertEqual(index.refresh(self.static), set())
+        read.assert_not_called()
+        self.assertEqual(index.fingerprint(), fingerprint)
+
+    def test_changed_and_removed_images(self):
+        index = ImageIndex.load(self.path)
+        index.refresh(self.static)
+        fingerprint = index.fingerprint()
+        self.write("images/a.png", png(30, 40) + b"\0")
+        os.remove(os.path.join(self.static, "images", "b.gif"))
+        self.assertEqual(index.refresh(self.static), {"/images/a.png", "/images/b.gif"})
+        self.assertEqual(index.size_of("/images/a.png"), (30, 40))
+        self.assertNotEqual(index.fingerprint(), fingerprint)
+
+    def test_stale_index_version_is_ignored(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            json.dump({"version": 0, "images": {"/x.png": [0, 0, 1, 1]}}, f)
+        self.assertEqual(ImageIndex.load(self.path).entries, {})
+
+class TestAnnotateImages(unittest.TestCase):
+    def test_first_image_is_eager_and_the_rest_lazy(self):
+        index = ImageIndex("images.json", {"/a.png": [0, 0, 10, 20]})
+        root = ParentNode("div", [
+            ParentNode("p", [LeafNode("img", "", {"src": "/a.png", "alt": "a"})]),
+            LeafNode("img", "", {"src": "https://example.com/b.png", "alt": "b"}),
+        ])
+        annotate_images(root, index)
+        self.assertEqual(
+            root.to_html(),
+            '<div><p><img src="/a.png" alt="a" width="10" height="20" fetchpriority="high" decoding="async"></img></p>'
+            '<img src="https://example.com/b.png" alt="b" loading="lazy" decoding="async"></img></div>',
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -327,6 +327,19 @@ class TestSplitImageLinks(unittest.TestCase):
             ],
             new_nodes,
         )
+
+    def test_split_links_after_image_with_same_text(self):
+        node = TextNode("![a](b) then [a](b)", TextType.TEXT)
+        self.assertListEqual(
+            split_nodes_link([node]),
+            [TextNode("![a](b) then ", TextType.TEXT), TextNode("a", TextType.LINK, "b")],
+        )
+
+    def test_split_many_links(self):
+        text = "".join(f"x [{i}](/{i})" for i in range(5000))
+        nodes = split_nodes_link([TextNode(text, TextType.TEXT)])
+        self.assertEqual(len(nodes), 10000)
+        self.assertEqual(nodes[-1], TextNode("4999", TextType.LINK, "/4999"))
 class Test_text_to_textnodes(unittest.TestCase):
     def test_text_to_textnodes_plain_text(self):
         text = "This is just plain text"
@@ -489,5 +502,59 @@ class Test_text_to_textnodes(unittest.TestCase):
             nodes,
         )
 
+    def test_text_to_textnodes_delimiters_literal_inside_bold(self):
+        text = "**snake_case and `tick` [link](/x)**"
+        nodes = text_to_textnodes(text)
+        self.assertListEqual(
+            [TextNode("snake_case and `tick` [link](/x)", TextType.BOLD)],
+            nodes,
+        )
+
+    def test_text_to_textnodes_code_literal_inside_italic(self):
+        text = "_see `this`_ now"
+        nodes = text_to_textnodes(text)
+        self.assertListEqual(
+            [
+                TextNode("see `this`", TextType.ITALIC),
+                TextNode(" now", TextType.TEXT),
+            ],
+            nodes,
+        )
+
+    def test_text_to_textnodes_underscore_breaks_link(self):
+        text = "[a_b](/x_y)"
+        nodes = text_to_textnodes(text)
+        self.assertListEqual(
+            [
+                TextNode("[a", TextType.TEXT),
+                TextNode("b](/x", TextType.ITALIC),
+                TextNode("y)", TextType.TEXT),
+            ],
+            nodes,
+        )
+
+    def test_text_to_textnodes_delimiter_in_later_link(self):
+        text = "[ok](/a) **b** [x*](/y) and [c`d](e`)"
+        nodes = text_to_textnodes(text)
+        self.assertListEqual(
+            [
+                TextNode("ok", TextType.LINK, "/a"),
+                TextNode(" ", TextType.TEXT),
+                TextNode("b", TextType.BOLD),
+                TextNode(" ", TextType.TEXT),
+                TextNode("x*", TextType.LINK, "/y"),
+                TextNode(" and [c", TextType.TEXT),
+                TextNode("d](e", TextType.CODE),
+                TextNode(")", TextType.TEXT),
+            ],
+            nodes,
+        )
+
+    def test_text_to_textnodes_unclosed_delimiters_raise(self):
+        for text in ["**bold", "_it", "`code", "_a **b** c_", "`a_b_c`"]:
+            with self.assertRaises(Exception) as context:
+                text_to_textnodes(text)
+            self.assertEqual(str(context.exception), "Invalid markdown: missing closing delimiter")
+
 if __name__ == "__main__":
     unittest.main()
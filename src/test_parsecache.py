@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+import parsecache
+from parsecache import ParseCache
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(os.path.join(self.tmp.name, "parse"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.cache.get("# Title"))
+        self.cache.put("# Title", "<div><h1>Title</h1></div>")
+        self.assertEqual(self.cache.get("# Title"), "<div><h1>Title</h1></div>")
+
+    def test_render_only_parses_once(self):
+        calls = []
+        def to_html(markdown):
+            calls.append(markdown)
+            return "<div></div>"
+        self.assertEqual(self.cache.render("text", to_html), "<div></div>")
+        self.assertEqual(self.cache.render("text", to_html), "<div></div>")
+        self.assertEqual(calls, ["text"])
+
+    def test_key_depends_on_parser_version(self):
+        key = self.cache.key("text")
+        saved = parsecache._parser_version
+        parsecache._parser_version = "other"
+        try:
+            self.assertNotEqual(self.cache.key("text"), key)
+        finally:
+            parsecache._parser_version = saved
+
+    def test_corrupt_entry_is_a_miss(self):
+        self.cache.put("text", "<div></div>")
+        with open(self.cache.path_for(self.cache.key("text")), "wb") as f:
+            f.write(b"not zlib")
+        self.assertIsNone(self.cache.get("text"))
+
+    def test_trim_evicts_least_recently_used(self):
+        for i, markdown in enumerate(["a", "b", "c"]):
+            self.cache.put(markdown, "x" * 1000 + markdown)
+            path = self.cache.path_for(self.cache.key(markdown))
+            os.utime(path, ns=(i * 10**9, i * 10**9))
+        self.cache.get("a")
+        size = os.path.getsize(self.cache.path_for(self.cache.key("a")))
+        self.cache.max_bytes = size * 2
+
+        removed, freed = self.cache.trim()
+        self.assertEqual(removed, 1)
+        self.assertEqual(freed, size)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNotNone(self.cache.get("c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import io
+import os
+import time
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import pipeline
+from pipeline import IOPipeline
+
+
+class TestIOPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        self.pages = []
+        for i in range(60):
+            source = os.path.join(self.root, f"page{i}.md")
+            with open(source, "w") as f:
+                f.write(f"# Page {i}\n\nText")
+            self.pages.append((source, os.path.join(self.root, "out", f"page{i}.html")))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_slow_writes_bound_pages_held_in_memory(self):
+        lock = threading.Lock()
+        held = [0]
+        peak = [0]
+        render = pipeline._render
+        write_output = pipeline.write_output
+
+        def counting_render(*args):
+            result = render(*args)
+            with lock:
+                held[0] += 1
+                peak[0] = max(peak[0], held[0])
+            return result
+
+        def slow_write(*args):
+            time.sleep(0.02)
+            write_output(*args)
+            with lock:
+                held[0] -= 1
+
+        driver = IOPipeline(read_ahead=2, write_behind=2, writers=1)
+        with mock.patch.object(pipeline, "_render", counting_render), \
+                mock.patch.object(pipeline, "write_output", slow_write), redirect_stdout(io.StringIO()):
+            results = driver.run(self.pages, self.template, "/")
+        self.assertEqual([error for error, _, _ in results], [None] * len(self.pages))
+        self.assertTrue(all(os.path.isfile(dest) for _, dest in self.pages))
+        self.assertLessEqual(peak[0], driver.read_ahead + driver.write_behind)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from build import BuildOptions, build_site
+from profiling import NULL_PROFILER, BuildProfiler
+
+class TestBuildProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        os.makedirs(os.path.join(root, "static"))
+        os.makedirs(self.content)
+        with open(os.path.join(root, "static", "index.css"), "w") as f:
+            f.write("body {}")
+        with open(os.path.join(root, "template.html"), "w") as f:
+            f.write('<link href="/index.css">{{ Title }}{{ Content }}')
+        with open(os.path.join(self.content, "small.md"), "w") as f:
+            f.write("# Small\n\nA [link](/x).")
+        with open(os.path.join(self.content, "big.md"), "w") as f:
+            f.write("# Big\n\n" + "\n\n".join("Some **bold** words." for _ in range(300)))
+        self.calls = []
+        self.profiler = BuildProfiler([lambda *call: self.calls.append(call)])
+        self.options = BuildOptions(
+            content_dir=self.content,
+            static_dir=os.path.join(root, "static"),
+            template_path=os.path.join(root, "template.html"),
+            dest_dir=os.path.join(root, "docs"),
+            cache_dir=os.path.join(root, ".cache"),
+            basepath="/site/",
+            profiler=self.profiler,
+        )
+        with redirect_stdout(io.StringIO()):
+            build_site(self.options)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_report_has_stages_and_slowest_pages(self):
+        report = self.profiler.report(slowest=1)
+        self.assertEqual(report["pages"], 2)
+        self.assertEqual(set(report["build_stages"]), {"static", "plan", "pages", "manifest", "links"})
+        for stage in ("read", "blocks", "inline", "tree", "to_html", "template", "write"):
+            self.assertIn(stage, report["page_stages"])
+        self.assertEqual([page["page"] for page in report["slowest_pages"]], [os.path.join(self.content, "big.md")])
+
+    def test_report_counts_bytes(self):
+        report = self.profiler.report()
+        output = os.path.join(self.tmp.name, "docs", "small.html")
+        self.assertGreater(report["bytes_read"], len("body {}"))
+        self.assertGreaterEqual(report["bytes_written"], os.path.getsize(output))
+
+    def test_profiled_output_matches_plain_build(self):
+        with open(os.path.join(self.tmp.name, "docs", "small.html")) as f:
+            profiled = f.read()
+        self.options.profiler = NULL_PROFILER
+        self.options.force = True
+        with redirect_stdout(io.StringIO()):
+            build_site(self.options)
+        with open(os.path.join(self.tmp.name, "docs", "small.html")) as f:
+            self.assertEqual(f.read(), profiled)
+        self.assertIn('href="/site/x"', profiled)
+
+    def test_report_lists_compression_savings(self):
+        self.options.compress = True
+        with redirect_stdout(io.StringIO()):
+            build_site(self.options)
+        report = self.profiler.report()
+        output = os.path.join(self.tmp.name, "docs", "big.html")
+        self.assertEqual(
+            report["counters"]["bytes_saved.gz"],
+            os.path.getsize(output) - os.path.getsize(output + ".gz"),
+        )
+
+    def test_hooks_receive_page_and_build_timings(self):
+        stages = set((stage, page is None) for stage, page, wall, cpu in self.calls)
+        self.assertIn(("static", True), stages)
+        self.assertIn(("inline", False), stages)
+
+    def test_write_report(self):
+        path = os.path.join(self.tmp.name, "report", "build.json")
+        self.profiler.write_report(path)
+        with open(path) as f:
+            self.assertEqual(json.load(f)["pages"], 2)
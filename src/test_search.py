@@ -0,0 +1,64 @@
+import os
+import json
+import tempfile
+import unittest
+from block_markdown import markdown_to_html_node
+from search import SearchIndex, decode_postings, encode_postings, page_terms, shard_for
+
+class TestTerms(unittest.TestCase):
+    def test_page_terms(self):
+        root = markdown_to_html_node("# Hello World\n\nHello **again**, a ![Cat picture](/cat.png)")
+        self.assertEqual(page_terms(root), {"hello": 2, "world": 1, "again": 1, "cat": 1, "picture": 1})
+
+    def test_shard_for(self):
+        self.assertEqual(shard_for("hello"), "he")
+        self.assertEqual(shard_for("x1"), "x1")
+        self.assertEqual(shard_for("élan"), "_")
+
+    def test_postings_round_trip(self):
+        encoded = encode_postings([(7, 1), (2, 3), (10, 2)])
+        self.assertEqual(encoded, [[2, 5, 3], [3, 1, 2]])
+        self.assertEqual(decode_postings(encoded), [(2, 3), (7, 1), (10, 2)])
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "docs")
+        self.path = os.path.join(self.tmp.name, "search.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.output, "search", name)) as f:
+            return json.load(f)
+
+    def test_write_and_update(self):
+        index = SearchIndex(self.path)
+        index.update("a.md", "/a.html", "A", {"hello": 1, "world": 2})
+        index.update("b.md", "/b.html", "B", {"hello": 3})
+        self.assertEqual(index.write(self.output), 2)
+        self.assertEqual(self.read("index.json")["pages"], [["/a.html", "A"], ["/b.html", "B"]])
+        self.assertEqual(self.read("index.json")["shards"], ["he", "wo"])
+        self.assertEqual(self.read("he.json"), {"hello": [[0, 1], [1, 3]]})
+        index.save()
+
+        index = SearchIndex.load(self.path)
+        shards = index.update("a.md", "/a.html", "A", {"hello": 1, "planet": 1})
+        self.assertEqual(shards, {"he", "wo", "pl"})
+        self.assertEqual(index.write(self.output, shards), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.output, "search", "wo.json")))
+        self.assertEqual(self.read("pl.json"), {"planet": [[0], [1]]})
+
+    def test_removed_page_ids_are_reused(self):
+        index = SearchIndex(self.path)
+        index.update("a.md", "/a.html", "A", {"hello": 1})
+        index.update("b.md", "/b.html", "B", {"hello": 1})
+        self.assertEqual(index.forget("a.md"), {"he"})
+        index.write(self.output)
+        self.assertEqual(self.read("index.json")["pages"], [None, ["/b.html", "B"]])
+        index.update("c.md", "/c.html", "C", {"hello": 1})
+        self.assertEqual(index.pages["c.md"]["id"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
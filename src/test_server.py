@@ -0,0 +1,155 @@
+import os
+import gzip
+import tempfile
+import unittest
+import http.client
+from unittest import mock
+from server import FileCache, PreviewHandler, ReloadNotifier, accepted_encodings, start_preview_server
+
+
+class TestAcceptedEncodings(unittest.TestCase):
+    def test_parses_codings_and_refused_qualities(self):
+        self.assertEqual(accepted_encodings("gzip, deflate, br;q=0.5"), {"gzip", "deflate", "br"})
+        self.assertEqual(accepted_encodings("br;q=0, GZIP"), {"gzip"})
+        self.assertEqual(accepted_encodings(None), set())
+
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def file(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path, os.stat(path)
+
+    def test_evicts_least_recently_used(self):
+        cache = FileCache(max_bytes=10, max_file_size=10)
+        a, a_stat = self.file("a", b"aaaa")
+        b, b_stat = self.file("b", b"bbbb")
+        c, c_stat = self.file("c", b"cccc")
+        cache.put(a, a_stat, b"aaaa")
+        cache.put(b, b_stat, b"bbbb")
+        self.assertEqual(cache.get(a, a_stat), b"aaaa")
+        cache.put(c, c_stat, b"cccc")
+        self.assertIsNone(cache.get(b, b_stat))
+        self.assertEqual(cache.get(a, a_stat), b"aaaa")
+        self.assertEqual(cache.size, 8)
+
+    def test_changed_file_misses(self):
+        cache = FileCache()
+        path, old = self.file("a", b"old")
+        cache.put(path, old, b"old")
+        os.utime(path, ns=(old.st_atime_ns, old.st_mtime_ns + 1))
+        self.assertIsNone(cache.get(path, os.stat(path)))
+
+    def test_large_files_are_not_cached(self):
+        cache = FileCache(max_file_size=2)
+        path, st = self.file("a", b"abc")
+        cache.put(path, st, b"abc")
+        self.assertEqual(cache.entries, {})
+
+
+class TestPreviewServer(unittest.TestCase):
+    def setUp(self):
+        quiet = mock.patch.object(PreviewHandler, "log_message")
+        quiet.start()
+        self.addCleanup(quiet.stop)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write("index.html", b"<html><body><p>Home</p></body></html>")
+        self.write("style.css", b"body { color: red; }" * 100)
+        self.write("big.bin", os.urandom(1024 * 1024))
+        self.cache = FileCache()
+        self.server = start_preview_server(self.root, 0, cache=self.cache)
+        self.connection = http.client.HTTPConnection("localhost", self.server.server_address[1], timeout=5)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        with open(os.path.join(self.root, name), "wb") as f:
+            f.write(data)
+
+    def get(self, path, headers=None, method="GET"):
+        self.connection.request(method, path, headers=headers or {})
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_keep_alive_and_conditional_requests(self):
+        response, body = self.get("/style.css")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, b"body { color: red; }" * 100)
+        self.assertEqual(response.getheader("Content-Type"), "text/css")
+        etag = response.getheader("ETag")
+        last_modified = response.getheader("Last-Modified")
+        sock = self.connection.sock
+
+        response, body = self.get("/style.css", {"If-None-Match": etag})
+        self.assertEqual((response.status, body), (304, b""))
+        self.assertEqual(response.getheader("ETag"), etag)
+        response, body = self.get("/style.css", {"If-Modified-Since": last_modified})
+        self.assertEqual((response.status, body), (304, b""))
+        response, _ = self.get("/style.css", {"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+        self.assertEqual(response.status, 200)
+        # All on one connection, and the body came from the cache.
+        self.assertIs(self.connection.sock, sock)
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 1))
+
+    def test_precompressed_variant_is_preferred(self):
+        with open(os.path.join(self.root, "style.css"), "rb") as f:
+            self.write("style.css.gz", gzip.compress(f.read()))
+        response, body = self.get("/style.css", {"Accept-Encoding": "gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(gzip.decompress(body), b"body { color: red; }" * 100)
+        gzip_etag = response.getheader("ETag")
+
+        response, body = self.get("/style.css")
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, b"body { color: red; }" * 100)
+        self.assertNotEqual(response.getheader("ETag"), gzip_etag)
+
+    def test_large_file_is_sent_whole(self):
+        with open(os.path.join(self.root, "big.bin"), "rb") as f:
+            expected = f.read()
+        response, body = self.get("/big.bin")
+        self.assertEqual(body, expected)
+        self.assertEqual(self.cache.entries, {})
+        response, body = self.get("/big.bin", method="HEAD")
+        self.assertEqual((response.getheader("Content-Length"), body), (str(len(expected)), b""))
+        response, body = self.get("/index.html")
+        self.assertEqual(body, b"<html><body><p>Home</p></body></html>")
+
+    def test_directories_and_missing_files(self):
+        response, _ = self.get("/")
+        self.assertEqual(response.status, 200)
+        response, _ = self.get("/missing.html")
+        self.assertEqual(response.status, 404)
+        os.mkdir(os.path.join(self.root, "blog"))
+        response, _ = self.get("/blog")
+        self.assertEqual((response.status, response.getheader("Location")), (301, "/blog/"))
+        response, _ = self.get("/style.css")
+        self.assertEqual(response.status, 200)
+
+    def test_live_reload_script_is_injected(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = start_preview_server(self.root, 0, ReloadNotifier())
+        self.connection = http.client.HTTPConnection("localhost", self.server.server_address[1], timeout=5)
+        response, body = self.get("/")
+        self.assertIn(b"<p>Home</p><script>new EventSource", body)
+        self.assertEqual(response.getheader("Content-Length"), str(len(body)))
+        response, body = self.get("/", {"If-None-Match": response.getheader("ETag")})
+        self.assertEqual((response.status, body), (304, b""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from htmlnode import LeafNode, ParentNode
+from template import TemplateError, compile_template, load_template, minify_markup
+
+class TestCompileTemplate(unittest.TestCase):
+    def test_render_fills_slots(self):
+        template = compile_template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        content = ParentNode("div", [LeafNode("p", "Hi")])
+        html = template.render_to_string(Title="Home", Content=content, basepath="/")
+        self.assertEqual(html, "<title>Home</title><main><div><p>Hi</p></div></main>")
+
+    def test_root_urls_get_basepath(self):
+        template = compile_template('<link href="/index.css"><img src="/a.png"><a href="https://x.com">{{ Title }}{{ Content }}')
+        html = template.render_to_string(Title="", Content="", basepath="/site/")
+        self.assertEqual(html, '<link href="/site/index.css"><img src="/site/a.png"><a href="https://x.com">')
+
+    def test_basepath_reaches_content_nodes(self):
+        template = compile_template('<a data-href="/x" href=/y>{{ Title }}</a>{{ Content }}')
+        content = ParentNode("p", [LeafNode("a", "post", {"href": "/blog/post"}), LeafNode("code", 'src="/z"')])
+        html = template.render_to_string(Title='src="/t"', Content=content, basepath="/site/")
+        self.assertEqual(
+            html,
+            '<a data-href="/x" href=/site/y>src="/t"</a><p><a href="/site/blog/post">post</a><code>src="/z"</code></p>',
+        )
+
+    def test_repeated_content_slot(self):
+        template = compile_template("{{ Title }}{{ Content }}|{{ Content }}")
+        html = template.render_to_string(Title="T", Content=LeafNode("b", "x"), basepath="/")
+        self.assertEqual(html, "T<b>x</b>|<b>x</b>")
+
+    def test_unknown_placeholder_raises(self):
+        with self.assertRaises(TemplateError) as context:
+            compile_template("{{ Title }}\n{{ Content }}\n{{ Author }}", "t.html")
+        self.assertEqual(str(context.exception), "t.html:3: unknown placeholder {{ Author }}")
+
+    def test_missing_placeholder_raises(self):
+        with self.assertRaises(TemplateError) as context:
+            compile_template("<title>{{ Title }}</title>", "t.html")
+        self.assertEqual(str(context.exception), "t.html: missing placeholder {{ Content }}")
+
+class TestMinifyMarkup(unittest.TestCase):
+    def test_drops_whitespace_between_blocks(self):
+        text = "<!doctype html>\n<html>\n  <head>\n    <title>{{ Title }}</title>\n  </head>\n</html>\n"
+        self.assertEqual(minify_markup(text), "<!doctype html><html><head><title>{{ Title }}</title></head></html>")
+
+    def test_keeps_single_space_between_inline_elements(self):
+        self.assertEqual(minify_markup("<p>a  <b>b</b>\n <i>c</i> </p>"), "<p>a <b>b</b> <i>c</i></p>")
+
+    def test_attributes(self):
+        self.assertEqual(
+            minify_markup('<link  href="/index.css"\n rel="stylesheet" /><meta content="a b" charset=\'utf-8\'>'),
+            '<link href=/index.css rel=stylesheet><meta content="a b" charset=utf-8>',
+        )
+
+    def test_raw_elements_are_untouched(self):
+        text = "<pre>\n  x   y\n</pre>\n<script>\n  if (a  <  b) {}\n</script>"
+        self.assertEqual(minify_markup(text), text.replace("</pre>\n", "</pre>"))
+
+    def test_minified_template_renders_minified_content(self):
+        template = compile_template("<main>\n  {{ Title }}\n  {{ Content }}\n</main>", minify=True)
+        content = ParentNode("p", [LeafNode(None, "a   b")])
+        html = template.render_to_string(Title="T", Content=content, basepath="/")
+        self.assertEqual(html, "<main>T <p>a b</p></main>")
+
+    def test_root_urls_stay_quoted_for_basepaths_that_need_it(self):
+        template = compile_template('<link href="/index.css"><a href="//x.com/">{{ Title }}</a>{{ Content }}', minify=True)
+        content = LeafNode("a", "post", {"href": "/blog/post"})
+        html = template.render_to_string(Title="T", Content=content, basepath="/my site/")
+        self.assertEqual(
+            html, '<link href="/my site/index.css"><a href=//x.com/>T</a><a href="/my site/blog/post">post</a>'
+        )
+        html = template.render_to_string(Title="T", Content=content, basepath="/site/")
+        self.assertEqual(html, "<link href=/site/index.css><a href=//x.com/>T</a><a href=/site/blog/post>post</a>")
+
+    def test_errors_report_original_lines(self):
+        with self.assertRaises(TemplateError) as context:
+            compile_template("<p>\n\n{{ Title }}{{ Content }}{{ Author }}</p>", "t.html", minify=True)
+        self.assertEqual(str(context.exception), "t.html:3: unknown placeholder {{ Author }}")
+
+class TestLoadTemplate(unittest.TestCase):
+    def test_cached_until_mtime_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Title }}{{ Content }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+
+            with open(path, "w") as f:
+                f.write("<h1>{{ Title }}</h1>{{ Content }}")
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+            second = load_template(path)
+            self.assertIsNot(second, first)
+            self.assertEqual(second.render_to_string(Title="T", Content="", basepath="/"), "<h1>T</h1>")
@@ -94,6 +94,14 @@ class TestTextNode(unittest.TestCase):
             text_node_to_html_node(node)
         self.assertEqual(str(context.exception), "TextNode is getting wrong values") 
 
+    def test_text_node_has_no_instance_dict(self):
+        self.assertFalse(hasattr(TextNode("x", TextType.TEXT), "__dict__"))
+
+    def test_every_text_type_converts(self):
+        for text_type in TextType:
+            html_node = text_node_to_html_node(TextNode("x", text_type, "/u"))
+            self.assertIsNone(html_node.children)
+
 
 if __name__ == "__main__":
     unittest.main()
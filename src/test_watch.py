@@ -0,0 +1,110 @@
+import os
+import io
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from build import BuildOptions, build_site
+from gencontent import BuildCancelled
+from watch import InotifyWatcher, PollingWatcher
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        os.makedirs(self.content)
+        with open(self.template, "w") as f:
+            f.write("{{ Title }}{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_watcher(self, watcher):
+        try:
+            page = os.path.join(self.content, "page.md")
+            with open(page, "w") as f:
+                f.write("# Page")
+            self.assertIn(os.path.normpath(page), watcher.read(timeout=2))
+            with open(self.template, "a") as f:
+                f.write("\n")
+            self.assertIn(os.path.normpath(self.template), watcher.read(timeout=2))
+            with open(os.path.join(self.tmp.name, "unrelated.txt"), "w") as f:
+                f.write("x")
+            self.assertEqual(watcher.read(timeout=0.2), set())
+        finally:
+            watcher.close()
+
+    def test_polling_watcher(self):
+        self.check_watcher(PollingWatcher([self.content, self.template], interval=0.05))
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = InotifyWatcher([self.content, self.template])
+        except (OSError, AttributeError):
+            self.skipTest("inotify is not available")
+        self.check_watcher(watcher)
+
+class TestTargetedBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        os.makedirs(os.path.join(root, "static"))
+        os.makedirs(self.content)
+        with open(os.path.join(root, "template.html"), "w") as f:
+            f.write("{{ Title }}{{ Content }}")
+        for name in ("a", "b"):
+            with open(os.path.join(self.content, f"{name}.md"), "w") as f:
+                f.write(f"# {name}")
+        self.options = BuildOptions(
+            content_dir=self.content,
+            static_dir=os.path.join(root, "static"),
+            template_path=os.path.join(root, "template.html"),
+            dest_dir=os.path.join(root, "docs"),
+            cache_dir=os.path.join(root, ".cache"),
+            force=True,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_only_changed_pages_are_considered(self):
+        with redirect_stdout(io.StringIO()):
+            build_site(self.options)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            build_site(self.options, changed={os.path.join(self.content, "b.md")})
+        self.assertIn("Generated 1 of 2 pages", out.getvalue())
+        self.assertNotIn("a.md", out.getvalue())
+
+    def test_template_change_considers_everything(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            build_site(self.options, changed={self.options.template_path})
+        self.assertIn("Generated 2 of 2 pages", out.getvalue())
+
+    def test_cancelled_build_raises(self):
+        cancel = threading.Event()
+        cancel.set()
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaises(BuildCancelled):
+                build_site(self.options, cancel=cancel)
+
+    def test_changed_image_rebuilds_pages_embedding_it(self):
+        static = self.options.static_dir
+        with open(os.path.join(static, "a.gif"), "wb") as f:
+            f.write(b"GIF89a\x01\0\x01\0")
+        with open(os.path.join(self.content, "b.md"), "w") as f:
+            f.write("# b\n\n![a](/a.gif)")
+        self.options.force = False
+        with redirect_stdout(io.StringIO()):
+            build_site(self.options)
+        with open(os.path.join(static, "a.gif"), "wb") as f:
+            f.write(b"GIF89a\x02\0\x02\0\0")
+        out = io.StringIO()
+        with redirect_stdout(out):
+            build_site(self.options, changed={os.path.join(static, "a.gif")})
+        self.assertIn("Generated 1 of 2 pages", out.getvalue())
+        with open(os.path.join(self.options.dest_dir, "b.html")) as f:
+            self.assertIn('width="2" height="2"', f.read())
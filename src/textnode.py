@@ -10,6 +10,8 @@ class TextType(Enum):
     IMAGE = "image"
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -25,21 +27,17 @@ class TextNode:
     def __repr__(self):
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
+_HTML_NODE_FACTORIES = {
+    TextType.TEXT: lambda node: LeafNode(None, node.text),
+    TextType.BOLD: lambda node: LeafNode("b", node.text),
+    TextType.ITALIC: lambda node: LeafNode("i", node.text),
+    TextType.CODE: lambda node: LeafNode("code", node.text),
+    TextType.LINK: lambda node: LeafNode("a", node.text, {"href": node.url}),
+    TextType.IMAGE: lambda node: LeafNode("img", "", {"src": node.url, "alt": node.text}),
+}
+
 def text_node_to_html_node(text_node):
-    if text_node.text_type == TextType.TEXT:
-        return LeafNode(None , text_node.text)
-    elif text_node.text_type == TextType.BOLD:
-        return LeafNode("b", text_node.text)
-    elif text_node.text_type == TextType.ITALIC:
-        return LeafNode("i", text_node.text)
-    elif text_node.text_type == TextType.CODE:
-        return LeafNode("code", text_node.text)
-    elif text_node.text_type == TextType.LINK:
-        return LeafNode("a", text_node.text, {"href": text_node.url})
-    elif text_node.text_type == TextType.IMAGE:
-        return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
-    else:
+    factory = _HTML_NODE_FACTORIES.get(text_node.text_type)
+    if factory is None:
         raise Exception("TextNode is getting wrong values")
-
-
-
+    return factory(text_node)
@@ -0,0 +1,222 @@
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from build import build_site
+from gencontent import BuildCancelled, PageGenerationError
+from server import ReloadNotifier, start_preview_server
+from template import TemplateError
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    def __init__(self, paths):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = [os.path.normpath(path) for path in paths]
+        self.directories = {}
+        self.files = set()
+        for path in self.paths:
+            if os.path.isdir(path):
+                self._watch_tree(path)
+            else:
+                # Editors often replace files by renaming over them, so a
+                # single file is watched through its parent directory.
+                self.files.add(path)
+                self._watch_directory(os.path.dirname(path) or ".")
+
+    def _watch_directory(self, directory):
+        wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOENT:
+                return
+            raise OSError(error, f"inotify_add_watch failed for {directory}")
+        self.directories[wd] = directory
+
+    def _watch_tree(self, root):
+        for directory, _, _ in os.walk(root):
+            self._watch_directory(directory)
+
+    def _wanted(self, path):
+        if path in self.files:
+            return True
+        for root in self.paths:
+            if path == root or path.startswith(root + os.sep):
+                return root not in self.files
+        return False
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                changed.update(self.paths)
+                continue
+            directory = self.directories.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.directories[wd]
+                continue
+            path = os.path.normpath(os.path.join(directory, os.fsdecode(name)))
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and self._wanted(path):
+                self._watch_tree(path)
+            if self._wanted(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    def __init__(self, paths, interval=0.5):
+        self.paths = [os.path.normpath(path) for path in paths]
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for path in self.paths:
+            if os.path.isfile(path):
+                self._stat_into(path, snapshot)
+            for directory, _, filenames in os.walk(path):
+                for name in filenames:
+                    self._stat_into(os.path.join(directory, name), snapshot)
+        return snapshot
+
+    def _stat_into(self, path, snapshot):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        snapshot[os.path.normpath(path)] = (stat.st_mtime_ns, stat.st_size)
+
+    def read(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = set(
+                path for path in current.keys() | self.snapshot.keys()
+                if current.get(path) != self.snapshot.get(path)
+            )
+            self.snapshot = current
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+def create_watcher(paths):
+    try:
+        return InotifyWatcher(paths)
+    except (OSError, AttributeError):
+        return PollingWatcher(paths)
+
+
+class Rebuilder:
+    def __init__(self, options, on_success=None):
+        self.options = options
+        self.on_success = on_success
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.thread = None
+        self.cancel = None
+
+    def schedule(self, changed):
+        if self.thread is not None and self.thread.is_alive():
+            self.cancel.set()
+            self.thread.join()
+        with self.lock:
+            self.pending |= changed
+            paths = frozenset(self.pending)
+        self.cancel = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(paths, self.cancel), daemon=True)
+        self.thread.start()
+
+    def _run(self, paths, cancel):
+        print(f"Rebuilding after changes to {', '.join(sorted(paths))}")
+        try:
+            build_site(self.options, changed=paths, cancel=cancel)
+        except BuildCancelled:
+            print("Rebuild cancelled by a newer change")
+            return
+        except (PageGenerationError, TemplateError) as e:
+            print(e)
+        with self.lock:
+            self.pending -= paths
+        if self.on_success is not None:
+            self.on_success()
+
+
+def watch_site(options, port=8888, debounce=0.2):
+    try:
+        build_site(options)
+    except (PageGenerationError, TemplateError) as e:
+        print(e)
+
+    notifier = ReloadNotifier()
+    server = start_preview_server(options.dest_dir, port, notifier)
+    watcher = create_watcher([options.content_dir, options.static_dir, options.template_path])
+    rebuilder = Rebuilder(options, on_success=notifier.notify)
+    print(f"Watching for changes, serving {options.dest_dir} on http://localhost:{port}/ ({type(watcher).__name__})")
+
+    try:
+        while True:
+            changed = watcher.read(timeout=1.0)
+            if not changed:
+                continue
+            # Debounce: keep collecting until the burst of saves goes quiet.
+            while True:
+                more = watcher.read(timeout=debounce)
+                if not more:
+                    break
+                changed |= more
+            rebuilder.schedule(changed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        server.shutdown()